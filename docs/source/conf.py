@@ -20,8 +20,8 @@ release = '0.1'
 
 extensions = [
     'sphinx.ext.duration',
-    'sphinx.ext.autodoc',
     'sphinx.ext.napoleon',
+    'autoapi.extension',
 ]
 
 templates_path = ['_templates']
@@ -30,10 +30,17 @@ exclude_patterns = []
 highlight_language = 'default'    # or 'python', doesn't affect SQL blocks
 pygments_style = 'sphinx'         # or another theme like 'monokai'
 pygments_dark_style = "native"    # good for Furo's dark mode
-autodoc_member_order = 'bysource' # Keep attrs and functions order when generating the docs
+
+# AutoAPI parses the sources statically, so the modules (and SQLAlchemy, selenium, partridge...) are not imported
+autoapi_type = 'python'
+autoapi_dirs = ['../../src']
+autoapi_generate_api_docs = False # Only the hand written pages, otherwise every class is documented twice
+autoapi_member_order = 'bysource' # Keep attrs and functions order when generating the docs
 
 # -- Options for HTML output -------------------------------------------------
 # https://www.sphinx-doc.org/en/master/usage/configuration.html#options-for-html-output
 
 html_theme = 'furo'
 html_static_path = ['_static']
+html_copy_source = False          # Do not copy the .rst sources into the output
+html_show_sourcelink = False
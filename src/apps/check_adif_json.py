@@ -1,21 +1,132 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import hashlib
 import requests
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from requests.adapters import HTTPAdapter
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from fake_useragent import UserAgent
 
-if __name__ == "__main__":
-    from fake_useragent import UserAgent
+from typing import Dict
+from typing import List
+from typing import Optional
 
-    ua = UserAgent()
-    URL = "https://www.adif.es/w/79100-granollers-centre"
+# Station page to scrap and the file where its HTML is saved
+STATIONS = {
+    "https://www.adif.es/w/79100-granollers-centre": "granollers.html",
+}
+# Markers of the departures table, if they are in the static HTML no browser is needed
+EXPECTED_MARKERS = ("tab-salidas", "horario-row")
+# Number of station pages downloaded concurrently
+MAX_WORKERS = 8
+# On-disk cache of the downloaded pages, entries are fresh for one day
+CACHE_DIR = Path(".adif-cache")
+CACHE_TTL = 24 * 60 * 60
+
+
+def build_driver(ua: UserAgent) -> webdriver.Chrome:
+    """
+    Build a headless Chrome driver tuned for fast page retrieval. It is meant to be built once and reused for all the
+    URLs, so the browser startup is paid only once.
+    """
     options = Options()
     options.add_argument("--headless")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--blink-settings=imagesEnabled=false")
     options.add_argument(f'user-agent={ua.random}')
-    driver = webdriver.Chrome(options=options)
-    driver.get(URL)
-    with open('granollers.html', 'w') as file:
-        file.write(driver.page_source)
-    driver.quit()
\ No newline at end of file
+    options.page_load_strategy = 'eager'
+    return webdriver.Chrome(options=options)
+
+
+def fetch(url: str, driver: webdriver.Chrome) -> str:
+    """
+    Load `url` in an already running driver and return the page source.
+    """
+    driver.get(url)
+    return driver.page_source
+
+
+def fetch_static(url: str, session: requests.Session, ua: UserAgent) -> Optional[str]:
+    """
+    Retrieve the HTML of `url` with a plain HTTP GET. Returns None if the request fails or the page does not contain
+    the expected markers, meaning it has to be rendered with a browser.
+    """
+    try:
+        resp = session.get(url, headers={'User-Agent': ua.random}, timeout=15)
+        resp.raise_for_status()
+    except requests.exceptions.RequestException:
+        return None
+    if not all(marker in resp.text for marker in EXPECTED_MARKERS):
+        return None
+    return resp.text
+
+
+def cache_path(url: str) -> Path:
+    """
+    Path of the cache entry for `url`, named after the SHA1 of the URL.
+    """
+    return CACHE_DIR / f"{hashlib.sha1(url.encode('utf-8')).hexdigest()}.html"
+
+
+def cache_get(url: str) -> Optional[str]:
+    """
+    Return the cached HTML of `url` if the entry exists and is younger than CACHE_TTL, None otherwise.
+    """
+    path = cache_path(url)
+    try:
+        if time.time() - path.stat().st_mtime < CACHE_TTL:
+            return path.read_text(encoding='utf-8')
+    except FileNotFoundError:
+        pass
+    return None
+
+
+def cache_set(url: str, html: str) -> None:
+    """
+    Store the HTML of `url` in the cache.
+    """
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    cache_path(url).write_text(html, encoding='utf-8')
+
+
+def fetch_all_static(urls: List[str], ua: UserAgent) -> Dict[str, Optional[str]]:
+    """
+    Download the static HTML of all `urls` concurrently, sharing one connection pool. The requests are I/O bound, so
+    the threads overlap the network round-trips.
+    """
+    with requests.Session() as session:
+        adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+        session.mount("https://", adapter)
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            pages = executor.map(lambda u: fetch_static(u, session, ua), urls)
+            return dict(zip(urls, pages))
+
+
+if __name__ == "__main__":
+    ua = UserAgent()
+    # Fresh cache entries skip the network entirely
+    pages = {url: cache_get(url) for url in STATIONS}
+    misses = [url for url, html in pages.items() if html is None]
+    static_pages = fetch_all_static(misses, ua)
+    # The browser is only started if some page needs JavaScript rendering
+    driver: Optional[webdriver.Chrome] = None
+    try:
+        for url, filename in STATIONS.items():
+            html = pages[url]
+            if html is None:
+                html = static_pages[url]
+                if html is None:
+                    if driver is None:
+                        driver = build_driver(ua)
+                    html = fetch(url, driver)
+                cache_set(url, html)
+            Path(filename).write_text(html, encoding='utf-8')
+    finally:
+        if driver is not None:
+            driver.quit()
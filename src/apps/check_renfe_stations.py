@@ -4,33 +4,50 @@
 import partridge as ptg
 import pandas as pd
 
+from collections import defaultdict
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4)
+def service_dates_by_path(gtfs_path: str):
+    """
+    Dates and their active service ids of the GTFS file, parsed once per file and reused by later lookups.
+    """
+    return ptg.read_service_ids_by_date(gtfs_path)
+
+
 if __name__ == "__main__":
 
     gtfs_path = './fomento_transit.zip'
-    feed = ptg.load_feed(gtfs_path, view=None)
-    matching_routes = feed.routes[feed.routes['route_short_name'] == 'R2N']
+    # Push the route filter into partridge: trips and stop_times are loaded already pruned to the R2N routes
+    view = {'routes.txt': {'route_short_name': 'R2N'}}
+    feed = ptg.load_feed(gtfs_path, view=view)
+    matching_routes = feed.routes
     route_trips = feed.trips[feed.trips['route_id'] == '51T0003R2N']
     trip_id = '5177V28556R2N'
     # 1. Get the service_id for this trip
     service_id = feed.trips.loc[feed.trips['trip_id'] == trip_id, 'service_id'].values[0]
 
     # 2. Get all service dates in the feed
-    service_dates = ptg.read_service_ids_by_date(gtfs_path)
+    service_dates = service_dates_by_path(gtfs_path)
 
-    # 3. Find dates where this service_id is active
-    active_dates = [date for date, ids in service_dates.items() if service_id in ids]
+    # 3. Index the dates by service_id once, so each service lookup is a dict access
+    dates_by_service = defaultdict(list)
+    for date, ids in service_dates.items():
+        for sid in ids:
+            dates_by_service[sid].append(date)
 
-    # Convert to sorted list of datetime.date
-    active_dates = sorted(active_dates)
+    # Sorted list of datetime.date where this service_id is active
+    active_dates = sorted(dates_by_service[service_id])
 
 
     stop_times = feed.stop_times[feed.stop_times['trip_id'] == trip_id]
-    stop_times_sorted = stop_times.sort_values('stop_sequence')
-    start_time = stop_times_sorted.iloc[0]['departure_time']
+    # The first departure is the row with the minimum stop_sequence, found without sorting
+    start_time = stop_times.loc[stop_times['stop_sequence'].idxmin(), 'departure_time']
     print(matching_routes[['route_id', 'route_short_name', 'route_long_name']])
     print(route_trips)
     print(f"Trip {trip_id} (service_id: {service_id}) runs on:")
     for date in active_dates:
         print(f" - {date}")
-    print(stop_times_sorted)
+    print(stop_times.sort_values('stop_sequence'))
     print(f"Trip {trip_id} starts at {start_time}")
\ No newline at end of file
@@ -5,18 +5,18 @@ Download a large GTFS file (e.g., 600MB) with robust streaming, resume support,
 Key features:
 - Streams to disk (no large memory usage)
 - Resume incomplete downloads using HTTP Range requests
-- Randomized User-Agent via fake_useragent (M2M style minimal headers)
-- Retries with backoff on transient errors
+- Randomized User-Agent from a static list of current browsers (M2M style minimal headers)
+- Retries with exponential backoff on transient errors (urllib3 Retry), resuming interrupted transfers
 - Progress logging (size, speed, ETA) to stdout
 - Configurable chunk size
 - Date-based output structure:
   - Saves to <base_dir>/<YYYY-MM-DD>/<YYYY-MM-DD>_<basename>
 - Optional comparison and deduplication:
-  - Compares today's file with yesterday's using SHA256
-  - If equal, deletes today's file and creates a symlink to yesterday's
+  - Compares today's file with yesterday's using SHA256 (or BLAKE3 for fast deduplication)
+  - If equal, deletes today's file and links it to yesterday's (hard link, or symlink across filesystems)
 
 Install dependencies:
-    pip install requests fake-useragent
+    pip install requests blake3
 
 Usage example:
     python src/apps/import/import_gtfs_large.py \
@@ -27,24 +27,55 @@ Usage example:
 from __future__ import annotations
 
 import argparse
+import errno
 import hashlib
 import logging
+import mmap
 import os
+import random
+import shutil
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Tuple
 from logging.handlers import RotatingFileHandler
 
+import blake3  # type: ignore
 import requests
-from fake_useragent import UserAgent  # type: ignore
+from requests.adapters import HTTPAdapter
+import urllib3
+from urllib3.util.retry import Retry
 
 from logging import Logger
 
 
-def build_headers(ua: UserAgent) -> Dict[str, str]:
-    """Minimal headers with randomized User-Agent."""
-    return {"User-Agent": ua.random}
+# Current desktop browsers; one is picked at random per download
+_UAS = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36 Edg/141.0.0.0",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:144.0) Gecko/20100101 Firefox/144.0",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:143.0) Gecko/20100101 Firefox/143.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/26.0 Safari/605.1.15",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/18.6 Safari/605.1.15",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:144.0) Gecko/20100101 Firefox/144.0",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/140.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:144.0) Gecko/20100101 Firefox/144.0",
+    "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:143.0) Gecko/20100101 Firefox/143.0",
+)
+
+
+def _rand_ua() -> str:
+    """Return a random User-Agent from the static list."""
+    return random.choice(_UAS)
+
+
+def build_headers(user_agent: str) -> Dict[str, str]:
+    """Minimal headers with the given User-Agent."""
+    return {"User-Agent": user_agent}
 
 
 def format_bytes(n: int) -> str:
@@ -57,20 +88,117 @@ def format_bytes(n: int) -> str:
     return f"{f:.2f} {units[i]}"
 
 
+MMAP_THRESHOLD = 10 * 1024 * 1024
+# Suffix of the file storing the SHA256 computed while downloading
+CHECKSUM_SUFFIX = ".sha256"
+
+
 def sha256_file(path: str, chunk_size: int = 8 * 1024 * 1024) -> str:
-    """Compute SHA256 checksum for a file in chunks."""
+    """
+    Compute SHA256 checksum for a file.
+
+    Files of MMAP_THRESHOLD bytes or more are memory-mapped and hashed with a single update() reading straight from
+    the page cache; smaller files are read in chunks into one reusable buffer, where the mmap setup cost does not pay
+    off. In both cases the kernel is told the access is sequential, so its readahead overlaps the disk reads with the
+    hashing.
+    """
     h = hashlib.sha256()
+    with open(path, "rb", buffering=0) as f:
+        if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                h.update(mm)
+        else:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            buf = bytearray(chunk_size)
+            view = memoryview(buf)
+            while True:
+                n = f.readinto(buf)
+                if not n:
+                    break
+                h.update(view[:n])
+    return h.hexdigest()
+
+
+def write_checksum_sidecar(path: str, digest: str) -> None:
+    """Store the SHA256 hex digest of `path` in <path>.sha256."""
+    with open(path + CHECKSUM_SUFFIX, "w", encoding="utf-8") as f:
+        f.write(digest)
+
+
+def read_checksum_sidecar(path: str) -> Optional[str]:
+    """
+    Return the SHA256 hex digest stored in <path>.sha256, or None if there is no sidecar or it is older than the
+    file, meaning the file was replaced after computing it.
+    """
+    sidecar = path + CHECKSUM_SUFFIX
+    try:
+        if os.path.getmtime(sidecar) < os.path.getmtime(path):
+            return None
+        with open(sidecar, "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def read_head(path: str, size: int = 8 * 1024) -> bytes:
+    """Read the first `size` bytes of a file."""
     with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(chunk_size), b""):
-            h.update(chunk)
+        return f.read(size)
+
+
+def checksum_file(path: str) -> str:
+    """
+    Compute a BLAKE3 checksum for a file.
+
+    Only meant for duplicate detection: BLAKE3 hashes the memory-mapped file with SIMD and several threads, being
+    several times faster than SHA256 on large archives.
+    """
+    h = blake3.blake3(max_threads=blake3.blake3.AUTO)
+    h.update_mmap(path=path)
     return h.hexdigest()
 
 
+def move_file(src: str, dst: str) -> None:
+    """
+    Move `src` to `dst`, atomically when both are in the same filesystem.
+
+    If they are not (EXDEV), the data is copied in the kernel with os.copy_file_range, which can reflink on btrfs/XFS,
+    synced to disk and the source removed. Falls back to a user-space copy where copy_file_range is not available.
+    """
+    try:
+        os.replace(src, dst)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            if not hasattr(os, "copy_file_range"):
+                raise OSError(errno.ENOSYS, "copy_file_range not available")
+            remaining = os.fstat(fsrc.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+        except OSError:
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+            shutil.copyfileobj(fsrc, fdst)
+        os.fsync(fdst.fileno())
+    os.unlink(src)
+
+
 def stream_download(url: str, out_path: str, max_attempts: int, logger: Logger) -> bool:
     """
     Stream download with resume support:
     - If <final_path>.partial exists, resume from its size.
     - Download to <final_path>.partial and rename to <final_path> when complete.
+    - Store the SHA256 of the file, computed while downloading, in <final_path>.sha256.
 
     Path and filename behavior:
     - Create a subdirectory under the provided out_path's directory named YYYY-MM-DD.
@@ -78,7 +206,7 @@ def stream_download(url: str, out_path: str, max_attempts: int, logger: Logger)
       For example, if out_path=/tmp/gtfs/gtfs.zip and now is 2025-11-30,
       the file will be saved as /tmp/gtfs/2025-11-30/2025-11-30_gtfs.zip.
     """
-    chunk_size=2048
+    chunk_size = 1024 * 1024
 
     # Derive dated directory and date-based filename
     now = datetime.now()
@@ -90,8 +218,8 @@ def stream_download(url: str, out_path: str, max_attempts: int, logger: Logger)
     dated_dir = os.path.join(base_dir, date_dir)
     final_out_path = os.path.join(dated_dir, f"{date_name}-{date_name}-renfe.zip")
 
-    ua = UserAgent()
-    headers = build_headers(ua)
+    # One User-Agent for all the attempts of this download
+    headers = build_headers(_rand_ua())
 
     # Ensure directories exist
     os.makedirs(dated_dir, exist_ok=True)
@@ -99,83 +227,142 @@ def stream_download(url: str, out_path: str, max_attempts: int, logger: Logger)
     # Use .partial file alongside final_out_path
     partial_path = final_out_path + ".partial"
 
-    # Determine resume offset
-    resume_from = 0
-    if os.path.exists(partial_path):
-        resume_from = os.path.getsize(partial_path)
-
-    attempt = 0
-    last_exc: Optional[Exception] = None
-    while attempt < max_attempts:
-        attempt += 1
-
-        # Add Range header if resuming
-        req_headers = dict(headers)
-        if resume_from > 0:
-            req_headers["Range"] = f"bytes={resume_from}-"
-
-        logger.info(
-            f"Attempt {attempt}/{max_attempts}: GET {url} -> {final_out_path} "
-            f"(resume_from={resume_from} bytes, chunk_size={format_bytes(chunk_size)})"
-        )
-
-        start_time = time.time()
-        try:
-            with requests.get(url, headers=req_headers, stream=True, timeout=(10, 60)) as resp:
-                status = resp.status_code
-                # Status handling:
-                # 200 OK for full download; 206 Partial Content for resume
-                if not (status == 200 or (status == 206 and resume_from > 0)):
-                    logger.warning(f"Unexpected status {status}; will retry")
-                    time.sleep(min(3.0, 0.25 * attempt))
-                    continue
-
-                # Get total length if server provides it
-                content_length = resp.headers.get("Content-Length")
-                try:
-                    total_bytes = int(content_length) if content_length is not None else None
-                except ValueError:
-                    total_bytes = None
-
-                # Open file in append or write mode
-                mode = "ab" if resume_from > 0 else "wb"
-                downloaded = resume_from
-                last_log_t = start_time
-
-                with open(partial_path, mode) as f:
-                    for chunk in resp.iter_content(chunk_size=chunk_size):
-                        if not chunk:
-                            continue
-                        f.write(chunk)
-                        downloaded += len(chunk)
-
-                        # Progress log roughly every second
-                        now_t = time.time()
-                        if now_t - last_log_t >= 1.0:
-                            elapsed = now_t - start_time
-                            speed_bps = (downloaded - resume_from) / elapsed if elapsed > 0 else 0
-                            speed_str = f"{format_bytes(int(speed_bps))}/s"
-                            total_str = format_bytes(downloaded)
-                            if total_bytes is not None:
-                                size_str = f"{total_str} / {format_bytes(resume_from + total_bytes)}"
-                                remaining = resume_from + total_bytes - downloaded
-                                eta = remaining / speed_bps if speed_bps > 0 else float("inf")
-                                eta_str = f"{int(eta)}s" if eta != float("inf") else "∞"
-                                logger.info(f"Progress: {size_str} at {speed_str}, ETA ~ {eta_str}")
-                            else:
-                                logger.info(f"Progress: {total_str} at {speed_str}")
-                            last_log_t = now_t
-
-                # Completed successfully; rename partial to final
-                os.replace(partial_path, final_out_path)
-                logger.info(f"Downloaded file saved to {final_out_path} ({format_bytes(downloaded)})")
-                return True
-
-        except (requests.exceptions.RequestException, OSError) as e:
-            last_exc = e
-            logger.warning(f"Attempt {attempt} failed: {e}")
-            # brief backoff
-            time.sleep(min(3.0, 0.5 * attempt))
+    # One session for every attempt so keep-alive connections are reused across retries and redirects.
+    # Connection errors and transient 5xx responses are retried by urllib3 on the same pool, with exponential backoff
+    # and honoring Retry-After; the loop below only restarts the transfer (resuming with Range) when the body fails, so
+    # each of them is bounded by max_attempts requests instead of multiplying both budgets
+    retry = Retry(
+        total=max_attempts - 1,
+        backoff_factor=0.5,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    try:
+        attempt = 0
+        last_exc: Optional[Exception] = None
+        while attempt < max_attempts:
+            attempt += 1
+
+            # Resume from whatever previous attempts already wrote
+            resume_from = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+
+            # Add Range header if resuming
+            req_headers = {**headers, "Range": f"bytes={resume_from}-"} if resume_from > 0 else headers
+
+            logger.info(
+                f"Attempt {attempt}/{max_attempts}: GET {url} -> {final_out_path} "
+                f"(resume_from={resume_from} bytes, chunk_size={format_bytes(chunk_size)})"
+            )
+
+            start_time = time.time()
+            resp = None
+            try:
+                with session.get(url, headers=req_headers, stream=True, timeout=(10, 60)) as resp:
+                    status = resp.status_code
+                    # Status handling:
+                    # 200 OK for full download; 206 Partial Content for resume
+                    if status == 416 and resume_from > 0:
+                        # The partial file does not match the remote one (e.g. the feed changed); start over
+                        logger.warning(f"Range not satisfiable; discarding {partial_path}")
+                        os.remove(partial_path)
+                        continue
+                    if not (status == 200 or (status == 206 and resume_from > 0)):
+                        # urllib3 already retried the transient statuses
+                        logger.error(f"Unexpected status {status}; giving up")
+                        return False
+
+                    # Get total length if server provides it
+                    content_length = resp.headers.get("Content-Length")
+                    try:
+                        total_bytes = int(content_length) if content_length is not None else None
+                    except ValueError:
+                        total_bytes = None
+
+                    # Open file for writing, or for updating after the already downloaded bytes when resuming
+                    mode = "r+b" if resume_from > 0 else "wb"
+                    downloaded = resume_from
+                    last_log_t = start_time
+
+                    # Read the body from urllib3 into one reusable buffer and write it to the file unbuffered, so
+                    # each chunk is handed to the file without an extra buffering layer; urllib3 still allocates the
+                    # chunk internally, and still undoes any Content-Encoding
+                    resp.raw.decode_content = True
+                    buf = bytearray(chunk_size)
+                    view = memoryview(buf)
+                    # The SHA256 is computed while downloading, so the file is not read again to compare it; when
+                    # resuming, the already downloaded bytes are hashed first, which leaves f positioned after them
+                    h = hashlib.sha256()
+                    with open(partial_path, mode, buffering=0) as f:
+                        hashed = 0
+                        while hashed < resume_from:
+                            n = f.readinto(view[:min(chunk_size, resume_from - hashed)])
+                            if not n:
+                                break
+                            h.update(view[:n])
+                            hashed += n
+                        # Reserve the remaining size in one go instead of growing the file chunk by chunk
+                        if total_bytes and hasattr(os, "posix_fallocate"):
+                            try:
+                                os.posix_fallocate(f.fileno(), resume_from, total_bytes)
+                            except OSError:
+                                # Only an optimization, not every filesystem supports it
+                                pass
+                        try:
+                            while True:
+                                n = resp.raw.readinto(buf)
+                                if not n:
+                                    break
+                                f.write(view[:n])
+                                h.update(view[:n])
+                                downloaded += n
+
+                                # Progress log roughly every second
+                                now_t = time.time()
+                                if now_t - last_log_t >= 1.0:
+                                    elapsed = now_t - start_time
+                                    speed_bps = (downloaded - resume_from) / elapsed if elapsed > 0 else 0
+                                    speed_str = f"{format_bytes(int(speed_bps))}/s"
+                                    total_str = format_bytes(downloaded)
+                                    if total_bytes is not None:
+                                        size_str = f"{total_str} / {format_bytes(resume_from + total_bytes)}"
+                                        remaining = resume_from + total_bytes - downloaded
+                                        eta = remaining / speed_bps if speed_bps > 0 else float("inf")
+                                        eta_str = f"{int(eta)}s" if eta != float("inf") else "∞"
+                                        logger.info(f"Progress: {size_str} at {speed_str}, ETA ~ {eta_str}")
+                                    else:
+                                        logger.info(f"Progress: {total_str} at {speed_str}")
+                                    last_log_t = now_t
+                        finally:
+                            # Drop the reserved space that was not written, so the size of the partial file is always
+                            # the offset to resume from
+                            f.truncate()
+
+                        # Make the data durable before the rename publishes the file
+                        os.fsync(f.fileno())
+
+                    # Completed successfully; rename partial to final
+                    move_file(partial_path, final_out_path)
+                    write_checksum_sidecar(final_out_path, h.hexdigest())
+                    logger.info(f"Downloaded file saved to {final_out_path} ({format_bytes(downloaded)})")
+                    return True
+
+            except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError, OSError) as e:
+                # The body is read from urllib3 directly, so a dropped connection raises urllib3 errors
+                last_exc = e
+                if resp is None:
+                    # The connection could not be established even after the urllib3 retries
+                    break
+                logger.warning(f"Attempt {attempt} failed: {e}")
+                # brief backoff
+                time.sleep(min(3.0, 0.5 * attempt))
+    finally:
+        session.close()
 
     logger.error(f"All attempts failed. Last exception: {last_exc}")
     return False
@@ -190,37 +377,36 @@ def find_latest_file_in_dir(dir_path: str, basename: str) -> Optional[str]:
 
     If the latest file is a symlink, resolve and return the symlink target path.
     """
-    if not os.path.isdir(dir_path):
-        return None
+    suffix = f"_{basename}"
+    latest: Optional[os.DirEntry] = None
     try:
-        candidates = [
-            f for f in os.listdir(dir_path)
-            if f.endswith(f"_{basename}") and len(f.split("_", 1)[0]) == 10  # "YYYY-MM-DD"
-        ]
+        # Single pass keeping the greatest name: the date prefix (YYYY-MM-DD) makes lexical order chronological
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                name = entry.name
+                if name.endswith(suffix) and name.find("_") == 10 and (latest is None or name > latest.name):
+                    latest = entry
     except OSError:
+        # Missing or unreadable directory
         return None
-    if not candidates:
+    if latest is None:
         return None
 
-    # Lexical sort works with date prefix (YYYY-MM-DD)
-    candidates.sort()
-    latest = os.path.join(dir_path, candidates[-1])
-
     # If latest is a symlink, resolve to its target (absolute)
     try:
-        if os.path.islink(latest):
-            target = os.readlink(latest)
+        if latest.is_symlink():
+            target = os.readlink(latest.path)
             if not os.path.isabs(target):
                 target = os.path.abspath(os.path.join(dir_path, target))
             return target
     except OSError:
         # If resolving fails, fall back to the symlink path itself
-        return latest
+        return latest.path
 
-    return latest
+    return latest.path
 
 
-def compare_today_with_previous_day_checksum(out_base_path: str) -> Tuple[bool, Optional[str], Optional[str]]:
+def compare_today_with_previous_day_checksum(out_base_path: str, fast_hash: bool = False) -> Tuple[bool, Optional[str], Optional[str]]:
     """
     Compare today's latest downloaded file against yesterday's latest using SHA256 checksum.
 
@@ -228,12 +414,16 @@ def compare_today_with_previous_day_checksum(out_base_path: str) -> Tuple[bool,
     - out_base_path: The original 'out' path used for downloads (e.g., /tmp/gtfs/gtfs.zip).
       Files are stored under:
         <dirname(out_base_path)>/<YYYY-MM-DD>/<YYYY-MM-DD>_<basename(out_base_path)>
+    - fast_hash: Use the BLAKE3 checksum_file instead of SHA256. Enough for deduplication,
+      where only equality matters.
 
     Returns:
     - (is_same, today_file, yesterday_file)
       where is_same is True if both files exist and their SHA256 hashes match,
-      False otherwise. today_file and yesterday_file are the paths used for comparison
-      (or None if not found).
+      False otherwise. Files with different sizes or first 8KB are reported as different
+      without hashing them, and the SHA256 stored in the .sha256 sidecar by stream_download
+      is used instead of hashing the file when available. today_file and yesterday_file are
+      the paths used for comparison (or None if not found).
     """
     base_dir = os.path.dirname(out_base_path) or "."
     base_name = os.path.basename(out_base_path)
@@ -251,8 +441,23 @@ def compare_today_with_previous_day_checksum(out_base_path: str) -> Tuple[bool,
         return False, today_file, yesterday_file
 
     try:
-        hash_today = sha256_file(today_file)
-        hash_yesterday = sha256_file(yesterday_file)
+        # Cheap pre-checks before hashing both files end to end: different sizes or different leading bytes
+        if os.path.getsize(today_file) != os.path.getsize(yesterday_file):
+            return False, today_file, yesterday_file
+        if read_head(today_file) != read_head(yesterday_file):
+            return False, today_file, yesterday_file
+        hash_func = checksum_file if fast_hash else sha256_file
+
+        def digest(path: str) -> str:
+            # The SHA256 stored by stream_download avoids reading the file again
+            return (None if fast_hash else read_checksum_sidecar(path)) or hash_func(path)
+
+        # Both files are independent and hashing releases the GIL, so they are hashed in parallel
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            future_today = executor.submit(digest, today_file)
+            future_yesterday = executor.submit(digest, yesterday_file)
+            hash_today = future_today.result()
+            hash_yesterday = future_yesterday.result()
         return hash_today == hash_yesterday, today_file, yesterday_file
     except OSError:
         return False, today_file, yesterday_file
@@ -260,31 +465,41 @@ def compare_today_with_previous_day_checksum(out_base_path: str) -> Tuple[bool,
 
 def deduplicate_today_with_symlink(today_file: str, yesterday_file: str, logger: logging.Logger) -> bool:
     """
-    When today's file is identical to yesterday's, replace today's file with a symlink to yesterday's.
+    When today's file is identical to yesterday's, replace today's file with a link to yesterday's.
 
     Behavior:
     - Deletes today's file.
-    - Creates a symbolic link at the same path (today_file) pointing to yesterday_file.
-    - If today_file already exists as a symlink, it will be replaced.
+    - Creates a hard link at the same path (today_file) to yesterday_file, so both names share the same data and
+      today's file survives if yesterday's is deleted.
+    - Falls back to a symbolic link if a hard link is not possible (different filesystems, no hard link support).
+    - If today_file already exists as a link, it will be replaced.
     - Returns True on success, False on failure.
 
     Notes:
     - The symlink target uses an absolute path to yesterday_file for robustness.
-    - Ensure the filesystem supports symlinks and the process has sufficient permissions.
+    - Ensure the filesystem supports links and the process has sufficient permissions.
     """
     try:
         # Remove today's file if it exists (regular file or symlink)
-        if os.path.exists(today_file) or os.path.islink(today_file):
+        try:
             os.remove(today_file)
             logger.info(f"Removed today's file: {today_file}")
+        except FileNotFoundError:
+            pass
 
-        # Use absolute path for target
-        target = os.path.abspath(yesterday_file)
-        os.symlink(target, today_file)
-        logger.info(f"Created symlink: {today_file} -> {target}")
+        try:
+            os.link(yesterday_file, today_file)
+            logger.info(f"Created hard link: {today_file} -> {yesterday_file}")
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                raise
+            # Use absolute path for target
+            target = os.path.abspath(yesterday_file)
+            os.symlink(target, today_file)
+            logger.info(f"Created symlink: {today_file} -> {target}")
         return True
     except OSError as e:
-        logger.error(f"Failed to create symlink from '{today_file}' to '{yesterday_file}': {e}")
+        logger.error(f"Failed to link '{today_file}' to '{yesterday_file}': {e}")
         return False
 
 
@@ -334,7 +549,7 @@ def main(argv=None) -> int:
     # if same and today_fp and yest_fp:
     #     logger_main.info(f"Today's file is identical to yesterday's (SHA256 match): {today_fp} == {yest_fp}")
     #     if deduplicate_today_with_symlink(today_fp, yest_fp, logger_main):
-    #         logger_main.info("Deduplication successful: today's file replaced with symlink to yesterday's.")
+    #         logger_main.info("Deduplication successful: today's file replaced with a link to yesterday's.")
     #     else:
     #         logger_main.warning("Deduplication attempted but failed.")
     # else:
@@ -4,13 +4,15 @@ Download M2M JSON using a randomized User-Agent from fake-useragent.
 
 Behavior:
 - Asks for a directory (positional argument) where the JSON will be saved.
-- The saved filename is always "renfe.json" prefixed with the current UTC timestamp
-  in the format: YYYY-MM-DD-HH-MM-SS (UTC)
-  Example: 2025-11-28-14-30-05-renfe.json
+- The saved filename is always "renfe.json.gz" prefixed with the current UTC timestamp
+  in the format: YYYY-MM-DD-HH-MM-SS (UTC), inside a YYYY-MM-DD daily directory
+  Example: 2025-11-28/2025-11-28-14-30-05-renfe.json.gz
+- The body is gzip compressed by a background thread while it is still being downloaded
 - Uses only User-Agent (generated via fake_useragent.ua.random)
 - Minimal headers (User-Agent only)
-- No requests.Session, no proxies
-- Retries a fixed number of times with a small randomized pause between attempts
+- A single requests.Session per download, reused across retry attempts; no proxies
+- Retries a fixed number of times with a jittered exponential backoff between attempts,
+  honoring the Retry-After header of 429/503 responses
 
 Install dependencies:
     pip install requests fake-useragent
@@ -19,23 +21,51 @@ Usage:
     python download_json.py https://gtfsrt.renfe.com/vehicle_positions.json /path/to/save/dir
 """
 import argparse
-import json
 import logging
 import os
 import random
+import re
 import sys
 import time
 import requests
 import datetime
+import gzip
+import itertools
+import queue
+import threading
+
+from requests.adapters import HTTPAdapter
 
 from fake_useragent import UserAgent
-from zoneinfo import ZoneInfo
 from logging.handlers import RotatingFileHandler
 
 from typing import Dict
+from typing import Iterable
+from typing import List
 from typing import Optional
 from logging import Logger
 
+_UA: Optional[UserAgent] = None
+_JSON_START = re.compile(rb"\s*[{\[]")
+_MAX_BACKOFF = 30.0
+_TS_FMT = "%Y-%m-%d-%H-%M-%S"
+_DAY_FMT = "%Y-%m-%d"
+_CHUNK_SIZE = 65536
+# Chunks buffered between the download and the writer thread, bounding the memory if the disk is slower
+_WRITE_QUEUE_SIZE = 8
+
+
+def _get_ua() -> UserAgent:
+    """
+    Return the module-level UserAgent, creating it on first use.
+
+    fake_useragent parses its User-Agent database on construction, so it is built only once per process.
+    """
+    global _UA
+    if _UA is None:
+        _UA = UserAgent()
+    return _UA
+
 
 def build_headers(ua: UserAgent) -> Dict[str, str]:
     """
@@ -44,71 +74,147 @@ def build_headers(ua: UserAgent) -> Dict[str, str]:
     return {"User-Agent": ua.random}
 
 
-def save_json_to_file(data, directory: str):
+def build_output_path(directory: str, suffix: str = "-renfe.json.gz") -> str:
     """
-    Save `data` to a UTC timestamped filename in `directory`.
-    Filename format: YYYY-MM-DD-HH-MM-SS_renfe.json (UTC)
+    Build the UTC timestamped output path inside a daily subdirectory of `directory`, creating it if needed.
+    Filename format: YYYY-MM-DD/YYYY-MM-DD-HH-MM-SS{suffix} (UTC)
     """
-    current_time = datetime.datetime.now(ZoneInfo("UTC"))
-    ts = current_time.strftime("%Y-%m-%d-%H-%M-%S")
-    day = current_time.strftime("%Y-%m-%d")
+    current_time = datetime.datetime.now(datetime.UTC)
+    ts = current_time.strftime(_TS_FMT)
+    day = current_time.strftime(_DAY_FMT)
     directory = os.path.join(directory, day)
-    filename = f"{ts}-renfe.json"
+    filename = f"{ts}{suffix}"
     os.makedirs(directory, exist_ok=True)
-    path = os.path.join(directory, filename)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    return os.path.join(directory, filename)
+
+
+def _write_chunks(path: str, chunks: queue.Queue, errors: List[OSError]) -> None:
+    """
+    Writer thread of save_chunks_to_file: compress the chunks taken from `chunks` into `path` until None is received.
+    On a write error the error is recorded and the queue is still drained, so the download never blocks.
+    """
+    try:
+        with gzip.open(path, "wb", compresslevel=1) as f:
+            while (chunk := chunks.get()) is not None:
+                f.write(chunk)
+    except OSError as e:
+        errors.append(e)
+        while chunks.get() is not None:
+            pass
+
+
+def save_chunks_to_file(chunks: Iterable[bytes], directory: str) -> str:
+    """
+    Write the body `chunks` gzip compressed to a UTC timestamped filename in `directory`. The chunks are compressed
+    and written by a background thread while the next ones are downloaded, and the payload is never held whole in
+    memory. If the download fails the partial file is removed.
+    """
+    path = build_output_path(directory)
+    pending: queue.Queue = queue.Queue(maxsize=_WRITE_QUEUE_SIZE)
+    errors: List[OSError] = list()
+    writer = threading.Thread(target=_write_chunks, args=(path, pending, errors), daemon=True)
+    writer.start()
+    try:
+        for chunk in chunks:
+            pending.put(chunk)
+    except BaseException:
+        pending.put(None)
+        writer.join()
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    pending.put(None)
+    writer.join()
+    if errors:
+        raise errors[0]
     return path
 
 
+def save_response_to_file(resp: requests.Response, directory: str) -> str:
+    """
+    Write the raw body of `resp`, gzip compressed, to a UTC timestamped filename in `directory`.
+    The payload is stored as received, without decoding and re-encoding the JSON.
+    """
+    return save_chunks_to_file(resp.iter_content(chunk_size=_CHUNK_SIZE), directory)
+
+
+def retry_delay(attempt: int, resp: Optional[requests.Response]) -> float:
+    """
+    Seconds to wait before the next attempt: the server's Retry-After for 429/503 responses when it is given in
+    seconds, otherwise a full-jitter exponential backoff capped at _MAX_BACKOFF.
+    """
+    if resp is not None and resp.status_code in (429, 503):
+        retry_after = resp.headers.get("Retry-After")
+        if retry_after is not None and retry_after.strip().isdigit():
+            return min(_MAX_BACKOFF, float(retry_after))
+    return min(_MAX_BACKOFF, random.uniform(0.0, 2 ** attempt * 0.5))
+
+
 def download_json(url: str, save_dir: str, logger: Logger, max_attempts: int = 5, verify_tls: bool = True) -> bool:
     """
-    Download JSON from url and save to save_dir with a UTC timestamped 'renfe.json' filename.
+    Download JSON from url and save to save_dir with a UTC timestamped 'renfe.json.gz' filename.
 
     Returns True on success, False on failure.
     """
-    ua = UserAgent()  # uses random UAs internally
-
-    attempt = 0
-    last_exception: Optional[Exception] = None
-    while attempt < max_attempts:
-        attempt += 1
-        headers = build_headers(ua=ua)
-        timeout = random.uniform(5.0, 20.0)
-        try:
-            logger.debug(f"Attempt {attempt}: GET {url} headers={headers} timeout={timeout:.1f}")
-            resp = requests.get(url, headers=headers, timeout=timeout, verify=verify_tls, allow_redirects=True)
-            logger.debug(f"Response status: {resp.status_code}")
-            if resp.status_code == 200:
-                content_type = resp.headers.get("Content-Type", "")
-                if "json" not in content_type.lower() and not resp.text.strip().startswith(("{", "[")):
-                    logger.warning(f"Response doesn't look like JSON (Content-Type: {content_type}). Attempting to parse anyway.")
-                data = resp.json()
-                saved_path = save_json_to_file(data, save_dir)
-                logger.info(f"Saved JSON to {saved_path}")
-                return True
-            elif resp.status_code in (401, 403):
-                logger.error(f"Access denied (status {resp.status_code}). Aborting.", )
-                return False
-            else:
-                logger.warning(f"Status {resp.status_code} received; will retry (attempt {attempt}/{max_attempts}).")
-        except (requests.exceptions.RequestException, ValueError) as xcpt:
-            last_exception = xcpt
-            logger.warning(f"Attempt {attempt} failed: {xcpt}")
-
-        # Fixed small randomized retry pause
-        sleep_seconds = random.uniform(1.0, 3.0)
-        logger.debug(f"Sleeping {sleep_seconds:.2f} seconds before next attempt")
-        time.sleep(sleep_seconds)
+    ua = _get_ua()  # uses random UAs internally
+
+    # One session for all the attempts so the TCP/TLS connection is reused; retries are driven by this loop
+    with requests.Session() as session:
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+        attempt = 0
+        last_exception: Optional[Exception] = None
+        while attempt < max_attempts:
+            attempt += 1
+            resp = None
+            headers = build_headers(ua=ua)
+            timeout = random.uniform(5.0, 20.0)
+            try:
+                logger.debug(f"Attempt {attempt}: GET {url} headers={headers} timeout={timeout:.1f}")
+                # The body is streamed to disk, never held whole in memory
+                resp = session.get(url, headers=headers, timeout=timeout, verify=verify_tls, allow_redirects=True,
+                                   stream=True)
+                logger.debug(f"Response status: {resp.status_code}")
+                if resp.status_code == 200:
+                    content_type = resp.headers.get("Content-Type", "")
+                    # Cheap validity check peeking the first non-blank byte of the first chunk, without decoding it to
+                    # str nor parsing it; the body is stored untouched
+                    chunks = resp.iter_content(chunk_size=_CHUNK_SIZE)
+                    head = next(chunks, b"")
+                    if _JSON_START.match(head) is None:
+                        raise ValueError(f"Response doesn't look like JSON (Content-Type: {content_type})")
+                    saved_path = save_chunks_to_file(itertools.chain((head,), chunks), save_dir)
+                    logger.info(f"Saved JSON to {saved_path}")
+                    return True
+                elif resp.status_code in (401, 403):
+                    logger.error(f"Access denied (status {resp.status_code}). Aborting.", )
+                    return False
+                else:
+                    logger.warning(f"Status {resp.status_code} received; will retry (attempt {attempt}/{max_attempts}).")
+            except (requests.exceptions.RequestException, ValueError) as xcpt:
+                last_exception = xcpt
+                logger.warning(f"Attempt {attempt} failed: {xcpt}")
+            finally:
+                # Release the connection of a streamed response that was not read to the end
+                if resp is not None:
+                    resp.close()
+
+            # No pause after the last attempt
+            if attempt < max_attempts:
+                sleep_seconds = retry_delay(attempt, resp)
+                logger.debug(f"Sleeping {sleep_seconds:.2f} seconds before next attempt")
+                time.sleep(sleep_seconds)
 
     logging.error(f"All attempts failed. Last exception: {last_exception}")
     return False
 
 
 if __name__ == "__main__":  # pragma: no cover
-    parser = argparse.ArgumentParser(description="Download M2M JSON using fake-useragent randomized User-Agent and save it as a UTC-timestamped renfe.json in the provided directory.")
+    parser = argparse.ArgumentParser(description="Download M2M JSON using fake-useragent randomized User-Agent and save it as a UTC-timestamped renfe.json.gz in the provided directory.")
     parser.add_argument("-u", "--url", help="URL of the JSON resource to download.")
-    parser.add_argument("-d", "--directory", help="Directory where the timestamped renfe.json will be saved.")
+    parser.add_argument("-d", "--directory", help="Directory where the timestamped renfe.json.gz will be saved.")
     parser.add_argument("-a", "--attempts", type=int, default=5, help="Maximum download attempts")
     parser.add_argument('-l', '--log-file', help='File to log progress or errors', required=False)
     args = parser.parse_args()
@@ -2,10 +2,15 @@
 # -*- coding: utf-8 -*-
 
 import argparse
+import enum
 import logging
 import partridge as ptg
 import sys
 from typing import Any
+from typing import Dict
+from typing import List
+from typing import Tuple
+from typing import Type
 
 import pandas as pd
 from logging.handlers import RotatingFileHandler
@@ -17,11 +22,153 @@ from sqlalchemy.orm import Session
 # Load the Stop model (no further action needed)
 from src.data_model.stop import Stop, LocationType, WheelchairBoarding  # noqa: F401
 
-def main(feed: Any, session: Session, logger: logging.Logger) -> None:
-    # Helper at the beginning of the function (readable: handles NaN, pd.NA, None)
-    def none_if_nan(v):
-        return None if pd.isna(v) else v
 
+# Number of stops loaded and committed per transaction
+BATCH_SIZE = 5000
+# GTFS stops.txt columns copied as they are into the Stop model
+STOP_COLUMNS = (
+    "stop_code",
+    "stop_name",
+    "tts_stop_name",
+    "stop_desc",
+    "stop_lat",
+    "stop_lon",
+    "zone_id",
+    "stop_url",
+    "stop_timezone",
+    "level_id",
+    "platform_code",
+)
+
+
+def enum_column(column: pd.Series, enum_type: Type[enum.Enum]) -> pd.Series:
+    """
+    Map a column of GTFS integer codes to the members of `enum_type`.
+
+    Parameters
+    ----------
+    column : pd.Series
+        Column with the codes, either as numbers or as strings.
+    enum_type : Type[enum.Enum]
+        Enumeration whose values are the GTFS codes.
+
+    Returns
+    -------
+    pd.Series
+        Column of enum members, with None where the code is missing or unknown.
+    """
+    codes = pd.to_numeric(column, errors="coerce")
+    return codes.map(enum_type._value2member_map_.get).astype(object)
+
+
+def stops_to_records(stops_df: pd.DataFrame) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Convert the GTFS stops table into a list of Stop keyword arguments with column operations.
+
+    Parameters
+    ----------
+    stops_df : pd.DataFrame
+        The `stops` table of the GTFS feed.
+
+    Returns
+    -------
+    tuple of (list of dict, int)
+        The records, without the missing values so the column nullability defaults apply, and the number of rows
+        skipped because they have no `stop_id`.
+    """
+    stop_id = stops_df["stop_id"] if "stop_id" in stops_df.columns else pd.Series(pd.NA, index=stops_df.index)
+    has_id = stop_id.notna() & (stop_id.astype(str).str.strip() != "")
+    df = stops_df[has_id]
+    skipped = len(stops_df) - len(df)
+
+    columns = {"stop_id": stop_id[has_id].astype(str)}
+    for name in STOP_COLUMNS:
+        if name in df.columns:
+            columns[name] = df[name]
+    if "location_type" in df.columns:
+        columns["location_type"] = enum_column(df["location_type"], LocationType)
+    if "wheelchair_boarding" in df.columns:
+        columns["wheelchair_boarding"] = enum_column(df["wheelchair_boarding"], WheelchairBoarding)
+    parent_column = "parent_station_id" if "parent_station_id" in df.columns else "parent_station"
+    if parent_column in df.columns:
+        columns["parent_stop_id"] = df[parent_column]
+
+    out = pd.DataFrame(columns).astype(object)
+    out = out.where(out.notna(), None)
+    # The rows are read as plain tuples, paired with the column names resolved once
+    names = list(out.columns)
+    records = [
+        {k: v for k, v in zip(names, row) if v is not None}
+        for row in out.itertuples(index=False, name=None)
+    ]
+    return parents_first(records), skipped
+
+
+def parents_first(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Order the Stop records so every parent station comes before the stops that reference it.
+
+    COPY checks the `parent_stop_id` foreign key row by row, so a child loaded before its parent fails. The GTFS
+    hierarchy is at most three levels deep (station, platform, boarding area), so the records are taken level by level.
+
+    Parameters
+    ----------
+    records : list of dict
+        Stop records, as built by `stops_to_records`.
+
+    Returns
+    -------
+    list of dict
+        The same records, stable within each level. Records whose parent is not in the list are placed last.
+    """
+    ordered: List[Dict[str, Any]] = list()
+    loaded = set()
+    remaining = records
+    while remaining:
+        ready: List[Dict[str, Any]] = list()
+        pending: List[Dict[str, Any]] = list()
+        for record in remaining:
+            parent = record.get("parent_stop_id")
+            (ready if parent is None or parent in loaded else pending).append(record)
+        if not ready:
+            # Unknown parents (or a cycle), the foreign key reports them when copied
+            ordered.extend(pending)
+            break
+        ordered.extend(ready)
+        loaded.update(record["stop_id"] for record in ready)
+        remaining = pending
+    return ordered
+
+
+def copy_stops(records: List[Dict[str, Any]], session: Session) -> None:
+    """
+    Load Stop records into the database with COPY FROM STDIN, in the transaction of `session`.
+
+    Parameters
+    ----------
+    records : list of dict
+        Stop fields keyed by column name, as returned by `stops_to_records`, with the parents before their children.
+        Only the Stop columns are read, so keys with other names (such as the GTFS `parent_station_id`) are not
+        stored, and missing keys are stored as NULL.
+    session : Session
+        Session whose connection is used; the caller is responsible for committing.
+
+    Notes
+    -----
+    The enumerations are stored with their member names, which are the labels of the PostgreSQL enum types created by
+    SQLAlchemy.
+    """
+    columns = Stop.__table__.columns.keys()
+    statement = f"COPY {Stop.__tablename__} ({', '.join(columns)}) FROM STDIN"
+    dbapi_connection = session.connection().connection
+    with dbapi_connection.cursor() as cursor:
+        with cursor.copy(statement) as copy:
+            for record in records:
+                row = [record.get(column) for column in columns]
+                copy.write_row([value.name if isinstance(value, enum.Enum) else value for value in row])
+
+
+def main(feed: Any, session: Session, logger: logging.Logger) -> None:
     # First: only try to load the stops DataFrame
     # noinspection PyBroadException
     try:
@@ -39,86 +186,34 @@ def main(feed: Any, session: Session, logger: logging.Logger) -> None:
 
     logger.info(f"Loaded {len(stops_df)} stops from the GTFS feed.")
 
-    # Second: separate try for creating Stop models from the entire DataFrame
-    # Note: When iterating rows (Series), both row['col'] and row.get('col') work.
-    # - Use row['col'] for required columns to fail fast if missing.
-    # - Use row.get('col') for optional columns to avoid KeyError when absent.
-    # We use row.get(...) below and validate required fields explicitly.
+    # Second: separate try for building the Stop rows from the entire DataFrame and storing them. The cleaning is
+    # done column-wise and the rows are streamed with COPY, without building ORM objects nor INSERT statements
     # noinspection PyBroadException
     try:
-        has_parent_station_id = "parent_station_id" in stops_df.columns
-        stops_models = []
-        created = 0
-        skipped = 0
-
-        for idx, row in stops_df.iterrows():
-            # Ensure we have a primary key
-            sid = none_if_nan(row.get("stop_id"))
-            if sid is None or str(sid).strip() == "":
-                skipped += 1
-                logger.debug(f"Skipping row {idx}: missing stop_id")
-                continue
-
-            # Map enums safely
-            loc_type_val = none_if_nan(row.get("location_type"))
-            # noinspection PyBroadException
-            try:
-                location_type_enum = LocationType(int(loc_type_val)) if loc_type_val is not None else None
-            except Exception:
-                location_type_enum = None
+        records, skipped = stops_to_records(stops_df)
+        if skipped:
+            logger.debug(f"Skipped {skipped} rows with missing stop_id")
+        created = len(records)
 
-            wh_val = none_if_nan(row.get("wheelchair_boarding"))
-            # noinspection PyBroadException
-            try:
-                wheelchair_enum = WheelchairBoarding(int(wh_val)) if wh_val is not None else None
-            except Exception:
-                wheelchair_enum = None
-
-            parent_station_val = (
-                none_if_nan(row.get("parent_station_id")) if has_parent_station_id
-                else none_if_nan(row.get("parent_station"))
-            )
-
-            stop_kwargs = {
-                "stop_id": str(sid),
-                "stop_code": none_if_nan(row.get("stop_code")),
-                "stop_name": none_if_nan(row.get("stop_name")),
-                "tts_stop_name": none_if_nan(row.get("tts_stop_name")),
-                "stop_desc": none_if_nan(row.get("stop_desc")),
-                "stop_lat": none_if_nan(row.get("stop_lat")),
-                "stop_lon": none_if_nan(row.get("stop_lon")),
-                "zone_id": none_if_nan(row.get("zone_id")),
-                "stop_url": none_if_nan(row.get("stop_url")),
-                "location_type": location_type_enum,
-                "parent_station_id": parent_station_val,
-                "stop_timezone": none_if_nan(row.get("stop_timezone")),
-                "wheelchair_boarding": wheelchair_enum,
-                "level_id": none_if_nan(row.get("level_id")),
-                "platform_code": none_if_nan(row.get("platform_code")),
-            }
-
-            # Remove None values to rely on column nullability defaults
-            stop_kwargs = {k: v for k, v in stop_kwargs.items() if v is not None}
+        logger.info(f"Prepared {created} Stop records ({skipped} skipped).")
 
+        # Each batch is its own transaction, so a large feed does not build one huge transaction
+        persisted = 0
+        for start in range(0, created, BATCH_SIZE):
+            batch = records[start:start + BATCH_SIZE]
             try:
-                stop_obj = Stop(**stop_kwargs)
-            except Exception as e:
-                skipped += 1
-                logger.debug(f"Skipping row {idx} due to model init error: {e}")
-                continue
-
-            stops_models.append(stop_obj)
-            created += 1
-
-        logger.info(f"Prepared {created} Stop models ({skipped} skipped).")
-
-        # Not persisting unless requested:
-        session.add_all(stops_models)
-        session.commit()
-        logger.info(f"Persisted {created} Stop records to the database.")
+                copy_stops(batch, session)
+                session.commit()
+            except Exception:
+                # Only the current batch is lost, the previous ones are already committed
+                session.rollback()
+                raise
+            persisted += len(batch)
+            logger.debug(f"Committed {persisted}/{created} Stop records.")
+        logger.info(f"Persisted {persisted} Stop records to the database.")
 
     except Exception:
-        logger.exception(f"Error creating Stop models from stops data")
+        logger.exception(f"Error creating Stop records from stops data")
 
 if __name__ == "__main__":  # pragma: no cover
     # Config the program arguments
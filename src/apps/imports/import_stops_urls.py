@@ -3,14 +3,17 @@
 
 import argparse
 import logging
-import json
 import sys
+import ijson
 
 from pathlib import Path
 from logging.handlers import RotatingFileHandler
 from sqlalchemy import create_engine
 from sqlalchemy import select
-from sqlalchemy import func
+from sqlalchemy import insert
+from sqlalchemy import values
+from sqlalchemy import column
+from sqlalchemy import String
 from sqlalchemy.engine import URL
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
@@ -19,25 +22,91 @@ from src.data_model.url_scrap import URLScrap
 from src.data_model.stop import Stop
 
 from typing import List
+from typing import Dict
+from typing import Any
+from typing import Optional
+
+BATCH_SIZE = 1000
+
+
+def import_batch(urls: List[URLScrap], skip: bool, session: Session, logger: logging.Logger) -> Optional[int]:
+    """
+    Validate a batch of URLs against the database and insert the new ones.
+
+    Parameters
+    ----------
+    urls : list of URLScrap
+        URLs parsed from the JSON file.
+    skip : bool
+        Skip URLs already stored instead of aborting the import.
+    session : Session
+        Open database session. The batch is inserted but not committed.
+    logger : logging.Logger
+        Logger used to report the validation errors.
+
+    Returns
+    -------
+    int or None
+        Number of inserted URLs, or None if the batch contains an invalid URL.
+    """
+    # Check the existence of all the URLs and their stops with a single query: the incoming (url, stop_id) pairs are
+    # sent as a VALUES list and left joined with both tables, returning one pair of existence flags per URL
+    incoming = values(column('url', String), column('stop_id', String), name='incoming').data(
+        [(url.url, url.stop_id) for url in urls]
+    )
+    stmt = select(
+        incoming.c.url,
+        incoming.c.stop_id,
+        URLScrap.url_id.is_not(None).label('url_exists'),
+        Stop.stop_id.is_not(None).label('stop_exists'),
+    ).select_from(
+        incoming
+        .outerjoin(URLScrap, URLScrap.url == incoming.c.url)
+        .outerjoin(Stop, Stop.stop_id == incoming.c.stop_id)
+    )
+    rows = session.execute(stmt).all()
+    existing_urls = {row.url for row in rows if row.url_exists}
+    existing_stops = {row.stop_id for row in rows if row.stop_exists}
+    to_insert: List[Dict[str, Any]] = list()
+    for url in urls:
+        if url.url not in existing_urls and url.stop_id in existing_stops:
+            to_insert.append({'url': url.url, 'url_type': url.url_type, 'stop_id': url.stop_id})
+            existing_urls.add(url.url)
+        elif url.url in existing_urls:
+            if not skip:
+                logger.error(f'Found existing URL {url.url} for stop {url.stop_id}')
+                return None
+        else:
+            logger.error(f'Stop not found for URL {url.url} with stop {url.stop_id}')
+            return None
+    if to_insert:
+        # Single executemany INSERT, bypassing the per-object unit of work
+        session.execute(insert(URLScrap), to_insert)
+    return len(to_insert)
+
 
 def main(json_file: str, skip: bool, session: Session, logger: logging.Logger) -> None:
-    with open(json_file) as file:
-        urls: List[URLScrap] = json.load(file, object_hook=URLScrap.object_hook)
-        logger.info(f'Found {len(urls)} URLs')
-        count_urls = 0
-        for url in urls:
-            count_url = session.scalar(select(func.count()).select_from(URLScrap).where(URLScrap.url == url.url))
-            count_stop  = session.scalar(select(func.count()).select_from(Stop).where(Stop.stop_id == url.stop_id))
-            if count_url == 0 and count_stop == 1:
-                session.add(url)
-                count_urls += 1
-            elif count_url == 1:
-                if not skip:
-                    logger.error(f'Found existing URL {url.url} for stop {url.stop_id}')
+    count_found = 0
+    count_urls = 0
+    batch: List[URLScrap] = list()
+    # Stream the JSON array so memory does not grow with the file size. Previous batches are already inserted in the
+    # current transaction, so duplicates spanning two batches are still detected by the database lookups
+    with open(json_file, 'rb') as file:
+        for item in ijson.items(file, 'item'):
+            batch.append(URLScrap.object_hook(item))
+            count_found += 1
+            if len(batch) >= BATCH_SIZE:
+                inserted = import_batch(batch, skip, session, logger)
+                if inserted is None:
                     return
-            elif count_stop == 0:
-                logger.error(f'Stop not found for URL {url.url} with stop {url.stop_id}')
-                return
+                count_urls += inserted
+                batch.clear()
+    if batch:
+        inserted = import_batch(batch, skip, session, logger)
+        if inserted is None:
+            return
+        count_urls += inserted
+    logger.info(f'Found {count_found} URLs')
     logger.info(f'Adding {count_urls} new URLs')
     session.commit()
 
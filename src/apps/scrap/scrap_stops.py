@@ -4,12 +4,21 @@
 import argparse
 import logging
 import sys
-import json
-import heapq
+import asyncio
 import datetime
-import time
+import gzip
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import orjson
 
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
+from logging.handlers import QueueHandler
 from logging.handlers import RotatingFileHandler
 from sqlalchemy import create_engine
 from sqlalchemy import select
@@ -21,73 +30,523 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from fake_useragent import UserAgent
 
 from src.data_model.stop import Stop
 from src.data_model.url_scrap import URLScrap
 from src.data_model.url_scrap import URLType
 from src.scrap.order import ScrapOrder
+from src.scrap.user_agents import random_user_agent
+from typing import Any
+from typing import Callable
+from typing import Dict
 from typing import List
+from typing import Optional
+from typing import Tuple
 
-def scrap_stop(order: ScrapOrder, session: Session, logger: logging.Logger) -> ScrapOrder:
-    stop: Stop = session.scalar(select(Stop).where(Stop.stop_id == order.stop_id))
-    urls: List[URLScrap] = list(session.scalars(select(URLScrap).where(URLScrap.stop_id == stop.stop_id)).all())
-    for url in urls:
+# Number of stops scraped concurrently, each in its own process with its own browser, and minimum time between two page
+# loads, in seconds
+SCRAP_WORKERS = int(os.environ.get("SCRAP_WORKERS", "4"))
+SCRAP_STAGGER = 0.1
+# Seconds a stop may take to be scraped before its process, and the browser in it, is killed
+SCRAP_TIMEOUT = int(os.environ.get("SCRAP_TIMEOUT", "90"))
+# Number of pages a browser loads before being replaced, bounding the memory that Chromium accumulates over time
+BROWSER_POOL_RECYCLE_AFTER = int(os.environ.get("BROWSER_POOL_RECYCLE_AFTER", "100"))
+# Resources never used by the scraper (only the HTML is saved), blocked in the browser
+BLOCKED_URLS = (
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    "*.css",
+    "*://*.google-analytics.com/*", "*://*.googletagmanager.com/*", "*://*.doubleclick.net/*",
+)
+# Chrome command line arguments shared by all the browsers
+BASE_OPTIONS_ARGS = (
+    "--headless",
+    # Features the scraper does not use, each costs CPU and memory per browser
+    "--blink-settings=imagesEnabled=false",
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--no-sandbox",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-sync",
+    "--disable-default-apps",
+    "--disable-features=TranslateUI,BlinkGenPropertyTrees",
+)
+# Selectors of the departures: the information iframe of a stop, the rows inside it and the rows of the station page
+IFRAME_SELECTOR_TEMPLATE = "iframe[src*='gravita.html'][src*='IdEstacion={stop_id}']"
+JS_INFO_ROWS_SELECTOR = "div.train-row"
+WEB_ROWS_SELECTOR = "#tab-salidas tr.horario-row"
+# Checked by the waits in a single script call per poll, instead of a find_elements round trip per poll
+READY_CHECK_SCRIPT = "return document.querySelector(arguments[0]) !== null;"
+# Interval between the checks of the explicit waits, Selenium polls every 0.5 s by default
+WAIT_POLL_FREQUENCY = 0.1
+# Only the part of the page holding the departures is saved: the body of the information iframe and the departures
+# tab of the station page. Both return null, falling back to the whole page, if the element is missing
+JS_INFO_FRAGMENT_SCRIPT = (
+    f"const row = document.querySelector(\"{JS_INFO_ROWS_SELECTOR}\"); return row && row.closest('body').innerHTML;"
+)
+WEB_FRAGMENT_SCRIPT = "const tab = document.getElementById('tab-salidas'); return tab && tab.outerHTML;"
+
+# Daily archive of the scraped pages, one gzipped JSON line per page, named {prefix}_{YYYY_MM_DD}.ndjson.gz
+ARCHIVE_PREFIX = "scrapes"
+
+
+class ScrapeArchive:
+    """
+    Append-only archive of the scraped pages, one gzipped NDJSON file per day. Appending to a few large files avoids
+    creating a small file per page and compresses the HTML.
+
+    Each record is flushed, so a crash loses at most the record being written and the rest of the file can be read.
+
+    Parameters
+    ----------
+    directory : Path
+        Directory where the daily files are created.
+    prefix : str
+        Prefix of the file names.
+    """
+
+    def __init__(self, directory: Path, prefix: str = ARCHIVE_PREFIX) -> None:
+        self._directory = directory
+        self._prefix = prefix
+        self._lock = threading.Lock()
+        self._day: Optional[datetime.date] = None
+        self._file: Optional[gzip.GzipFile] = None
+
+    def write(self, stop_id: str, scheduled_at: datetime.datetime, url_type: URLType, html: str) -> None:
+        """
+        Append the page scraped from a URL of `url_type` for the order of `stop_id` planned at `scheduled_at`. The file
+        is rotated when the day changes.
+        """
+        record = orjson.dumps({"stop_id": stop_id, "ts": scheduled_at, "type": url_type.name, "html": html})
+        with self._lock:
+            today = datetime.date.today()
+            if self._day != today:
+                self._close()
+                path = self._directory / f"{self._prefix}_{today.strftime('%Y_%m_%d')}.ndjson.gz"
+                self._file = gzip.open(path, 'ab')
+                self._day = today
+            self._file.write(record + b"\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        """
+        Close the current file.
+        """
+        with self._lock:
+            self._close()
+
+    def _close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._day = None
+
+
+def _make_driver() -> webdriver.Chrome:
+    """
+    Launch a headless Chrome with a random User-Agent, the browser cache disabled and the resources that are not
+    needed to build the DOM blocked.
+    """
+    options = Options()
+    for argument in BASE_OPTIONS_ARGS:
+        options.add_argument(argument)
+    options.add_argument(f'user-agent={random_user_agent()}')
+    # driver.get returns at DOMContentLoaded, the waits in scrap_stop decide when the content is there
+    options.page_load_strategy = 'eager'
+    driver = webdriver.Chrome(options=options)
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setCacheDisabled", {"cacheDisabled": True})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(BLOCKED_URLS)})
+    return driver
+
+
+class BrowserPool:
+    """
+    Bounded pool of running Chrome drivers, so the browser startup is not paid for every scraped URL.
+
+    The drivers are launched on checkout: a slot whose driver was quit, or never launched, gets a new one from
+    `factory`. If the launch fails the slot stays empty and the error is raised, so a failed launch never shrinks the
+    pool.
+
+    Parameters
+    ----------
+    size : int
+        Number of drivers kept in the pool.
+    recycle_after : int
+        Number of uses after which a driver is quit and replaced by a new one.
+    factory : Callable[[], webdriver.Chrome]
+        Function that launches a new driver.
+    """
+
+    def __init__(self, size: int, recycle_after: int, factory: Callable[[], webdriver.Chrome]) -> None:
+        self._recycle_after = recycle_after
+        self._factory = factory
+        self._idle: queue.Queue[Tuple[Optional[webdriver.Chrome], int]] = queue.Queue(maxsize=size)
+        self._uses: Dict[int, int] = dict()
+        for _ in range(size):
+            self._idle.put((None, 0))
+
+    def acquire(self) -> webdriver.Chrome:
+        """
+        Check out a driver, waiting until a slot is available and launching its driver if needed.
+        """
+        driver, uses = self._idle.get()
+        if driver is None:
+            try:
+                driver = self._factory()
+            except BaseException:
+                self._idle.put((None, 0))
+                raise
+        self._uses[id(driver)] = uses
+        return driver
+
+    def release(self, driver: webdriver.Chrome) -> None:
+        """
+        Return a healthy driver to the pool, resetting its state, or replace it if it reached `recycle_after` uses.
+        """
+        uses = self._uses.pop(id(driver)) + 1
+        if uses >= self._recycle_after:
+            self._replace(driver)
+            return
+        # noinspection PyBroadException
+        try:
+            driver.switch_to.default_content()
+            driver.delete_all_cookies()
+        except Exception:
+            self._replace(driver)
+            return
+        self._idle.put((driver, uses))
+
+    def discard(self, driver: webdriver.Chrome) -> None:
+        """
+        Replace a driver that may be broken (e.g. after a failed page load) with a new one.
+        """
+        self._uses.pop(id(driver), None)
+        self._replace(driver)
+
+    def close(self) -> None:
+        """
+        Quit all the idle drivers.
+        """
+        while not self._idle.empty():
+            driver, _ = self._idle.get_nowait()
+            if driver is not None:
+                self._quit(driver)
+
+    def _replace(self, driver: webdriver.Chrome) -> None:
+        # The new driver is launched by the next acquire
+        self._quit(driver)
+        self._idle.put((None, 0))
+
+    @staticmethod
+    def _quit(driver: webdriver.Chrome) -> None:
+        # noinspection PyBroadException
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+
+_POOL: Optional[BrowserPool] = None
+
+
+def _get_pool() -> BrowserPool:
+    """
+    Return the BrowserPool of the current process, launching its browser on first use. A scraping process runs one
+    stop at a time, so it holds a single browser.
+    """
+    global _POOL
+    if _POOL is None:
+        _POOL = BrowserPool(1, BROWSER_POOL_RECYCLE_AFTER, _make_driver)
+    return _POOL
+
+
+def _init_scrap_process(log_queue: multiprocessing.Queue, levels: Dict[str, int]) -> None:
+    """
+    Initializer of the scraping processes.
+
+    Each process leads its own process group, which the browsers it launches join, so a stuck process can be killed
+    along with its chromedriver and Chrome processes. The log records are sent to the scheduler process through
+    `log_queue`, with the logger levels of the scheduler given in `levels`.
+    """
+    os.setpgrp()
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(log_queue)]
+    for name, level in levels.items():
+        logging.getLogger(name or None).setLevel(level)
+
+
+def _logger_levels() -> Dict[str, int]:
+    """
+    Levels of the root logger (keyed by the empty name) and of the loggers with an explicit level in this process.
+    """
+    levels = {"": logging.getLogger().level}
+    for name, logger in logging.Logger.manager.loggerDict.items():
+        if isinstance(logger, logging.Logger) and logger.level != logging.NOTSET:
+            levels[name] = logger.level
+    return levels
+
+
+def _forward_logs(log_queue: multiprocessing.Queue) -> None:
+    """
+    Hand the log records of the scraping processes to the loggers of the scheduler process until None is received.
+    """
+    while (record := log_queue.get()) is not None:
+        logging.getLogger(record.name).handle(record)
+
+
+class ScrapProcessPool:
+    """
+    Process pool running scrap_stop, isolating the scheduler from browser hangs and crashes.
+
+    A scrap that exceeds its timeout, or a process that dies (e.g. killed by the OOM killer), makes the pool kill all
+    its processes with their browsers and start a new set of processes. The scraps in flight fail and are rescheduled
+    by their workers.
+
+    The processes are started by a forkserver, so they are not forked from the multithreaded scheduler, and their log
+    records are forwarded to the handlers of the scheduler.
+
+    Parameters
+    ----------
+    max_workers : int
+        Number of scraping processes.
+    """
+
+    def __init__(self, max_workers: int) -> None:
+        self._max_workers = max_workers
+        self._context = multiprocessing.get_context("forkserver")
+        self._log_queue = self._context.Queue()
+        self._log_forwarder = threading.Thread(target=_forward_logs, args=(self._log_queue,), daemon=True)
+        self._log_forwarder.start()
+        self._executor = self._start()
+
+    def _start(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self._max_workers, mp_context=self._context,
+                                   initializer=_init_scrap_process, initargs=(self._log_queue, _logger_levels()))
+
+    async def run(self, timeout: float, func: Callable, *args) -> Any:
+        """
+        Run `func(*args)` in a scraping process and return its result.
+
+        Raises
+        ------
+        TimeoutError
+            If the call did not finish in `timeout` seconds, the pool is restarted.
+        BrokenProcessPool
+            If a scraping process died, the pool is restarted.
+        """
+        executor = self._executor
+        try:
+            return await asyncio.wait_for(asyncio.get_running_loop().run_in_executor(executor, func, *args), timeout)
+        except (TimeoutError, BrokenProcessPool):
+            self._restart(executor)
+            raise
+
+    def close(self) -> None:
+        """
+        Stop the scraping processes and the browsers they launched. The processes are killed first, so a hung browser
+        cannot block the shutdown.
+        """
+        self._kill(self._pids(self._executor))
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._log_queue.put(None)
+        self._log_forwarder.join(timeout=5)
+
+    def _restart(self, executor: ProcessPoolExecutor) -> None:
+        # Several workers may fail on the same broken pool, only the first one restarts it
+        if executor is not self._executor:
+            return
+        self._executor = self._start()
+        # Killing the processes fails the remaining scraps of the old pool with BrokenProcessPool
+        self._kill(self._pids(executor))
+        executor.shutdown(wait=False)
+
+    @staticmethod
+    def _pids(executor: ProcessPoolExecutor) -> List[int]:
+        # ProcessPoolExecutor does not expose its processes, _processes maps their pids to the Process objects
+        return list(getattr(executor, "_processes", None) or ())
+
+    @staticmethod
+    def _kill(pids: List[int]) -> None:
+        for pid in pids:
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+
+
+def write_pages(archive: ScrapeArchive, order: ScrapOrder, pages: List[Tuple[URLType, str]],
+                logger: logging.Logger) -> None:
+    """
+    Append the pages scraped for `order` to `archive`, logging the error if it fails since it runs in the background
+    writer.
+    """
+    try:
+        for url_type, html in pages:
+            archive.write(order.stop_id, order.scheduled_at, url_type, html)
+    except OSError as e:
+        logger.error(f'Failed to archive the pages of stop {order.stop_id}: {e}')
+
+
+def scrap_stop(order: ScrapOrder, urls: List[Tuple[str, URLType]],
+               logger: logging.Logger) -> Tuple[ScrapOrder, List[Tuple[URLType, str]]]:
+    """
+    Scrap the URLs of a stop with the browser of the current process. Returns the next order of the stop and the
+    pages scraped, which are archived by the scheduler process.
+    """
+    pool = _get_pool()
+    driver = pool.acquire()
+    pages: List[Tuple[URLType, str]] = list()
+    for url_to_scrap, url_type in urls:
         try:
-            ua = UserAgent()
-            url_to_scrap = url.url
-            options = Options()
-            options.add_argument("--headless")
-            options.add_argument(f'user-agent={ua.random}')
-            driver = webdriver.Chrome(options=options)
-            driver.execute_cdp_cmd("Network.setCacheDisabled", {"cacheDisabled": True})
             driver.get(url_to_scrap)
-            if url.url_type == URLType.ADIF_JS_INFO:
-                iframe_locator = (By.CSS_SELECTOR, f"iframe[src*='gravita.html'][src*='IdEstacion={stop.stop_id}']")
-                WebDriverWait(driver, 20).until(
+            if url_type == URLType.ADIF_JS_INFO:
+                iframe_locator = (By.CSS_SELECTOR, IFRAME_SELECTOR_TEMPLATE.format(stop_id=order.stop_id))
+                WebDriverWait(driver, 20, poll_frequency=WAIT_POLL_FREQUENCY).until(
                     EC.frame_to_be_available_and_switch_to_it(iframe_locator)
                 )
                 # Now inside; wait for internal content
-                WebDriverWait(driver, 20).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "div.train-row"))  # tailor this selector
+                WebDriverWait(driver, 20, poll_frequency=WAIT_POLL_FREQUENCY).until(
+                    lambda d: d.execute_script(READY_CHECK_SCRIPT, JS_INFO_ROWS_SELECTOR)
                 )
-                html_to_write = driver.page_source
+                html_to_write = driver.execute_script(JS_INFO_FRAGMENT_SCRIPT) or driver.page_source
             else:
-                WebDriverWait(driver, 20).until(
-                    lambda d: len(d.find_elements(By.CSS_SELECTOR, "#tab-salidas tr.horario-row")) >= 1
+                WebDriverWait(driver, 20, poll_frequency=WAIT_POLL_FREQUENCY).until(
+                    lambda d: d.execute_script(READY_CHECK_SCRIPT, WEB_ROWS_SELECTOR)
                 )
-                html_to_write = driver.page_source
+                html_to_write = driver.execute_script(WEB_FRAGMENT_SCRIPT) or driver.page_source
         except Exception as e:
-            driver.quit()
-            logger.error(f'Failed to scrap stop {stop.stop_id}: {e}')
-            return ScrapOrder(scheduled_at=order.scheduled_at + datetime.timedelta(minutes=1), stop_id=order.stop_id)
-        with open(f"{stop.stop_id}_{order.scheduled_at.strftime('%Y_%m_%d_%H_%M_%S')}_{url.url_type.name}.html", 'w') as file:
-            file.write(html_to_write)
-        driver.quit()
-    return ScrapOrder(scheduled_at=order.scheduled_at + datetime.timedelta(minutes=5), stop_id=order.stop_id)
-
-def main(stops_file: str, session: Session, logger: logging.Logger) -> None:
-    queue: List[ScrapOrder] = list()
-    stops_to_scrap: List[str] = list()
-    with open(stops_file) as file:
-        stops_to_scrap: List[str] = json.load(file)
+            pool.discard(driver)
+            logger.error(f'Failed to scrap stop {order.stop_id}: {e}')
+            return ScrapOrder(order.scheduled_at + datetime.timedelta(minutes=1), order.stop_id), pages
+        pages.append((url_type, html_to_write))
+        # Leave the iframe before loading the next URL
+        driver.switch_to.default_content()
+    pool.release(driver)
+    return ScrapOrder(order.scheduled_at + datetime.timedelta(minutes=5), order.stop_id), pages
+
+
+def _fmt(dt: datetime.datetime) -> str:
+    """
+    Format `dt` as YYYY-MM-DD HH:MM:SS for the log, with integer fields instead of strftime.
+    """
+    return f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d} {dt.hour:02d}:{dt.minute:02d}:{dt.second:02d}"
+
+
+def put_order(orders: asyncio.PriorityQueue, order: ScrapOrder) -> None:
+    """
+    Queue `order` keyed by (scheduled_at, stop_id), so the heap compares plain tuples instead of calling
+    ScrapOrder.__lt__.
+    """
+    orders.put_nowait((order.scheduled_at, order.stop_id, order))
+
+
+async def scrap_worker(orders: asyncio.PriorityQueue, wake: asyncio.Event, throttle: asyncio.Lock,
+                       processes: ScrapProcessPool, writer: ThreadPoolExecutor, archive: ScrapeArchive,
+                       urls_by_stop: Dict[str, List[Tuple[str, URLType]]], logger: logging.Logger) -> None:
+    """
+    Take the earliest order, wait until it is due, scrap it in a process of `processes`, archive the pages in the
+    thread of `writer` and schedule the next order of the stop. Runs forever.
+
+    While waiting, the worker is woken up by `wake` every time an order is queued, and swaps its order for the queued
+    one if it is due earlier.
+    """
+    while True:
+        *_, order = await orders.get()
+        while True:
+            delay = max(0.0, (order.scheduled_at - datetime.datetime.now()).total_seconds())
+            if delay == 0:
+                break
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f'Sleeping for {delay} seconds')
+            wake.clear()
+            try:
+                await asyncio.wait_for(wake.wait(), timeout=delay)
+            except TimeoutError:
+                break
+            # Keep the earliest of the held order and the queued ones
+            put_order(orders, order)
+            *_, order = orders.get_nowait()
+        # All the orders go to the same site, space out the page loads
+        async with throttle:
+            await asyncio.sleep(SCRAP_STAGGER)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f'Processing order for {order.stop_id} planned at {_fmt(order.scheduled_at)}')
+        urls = urls_by_stop[order.stop_id]
+        try:
+            next_order, pages = await processes.run(SCRAP_TIMEOUT, scrap_stop, order, urls, logger)
+            writer.submit(write_pages, archive, order, pages, logger)
+        except TimeoutError:
+            logger.error(f'Scraping stop {order.stop_id} timed out after {SCRAP_TIMEOUT} seconds, restarting the browsers')
+            next_order = ScrapOrder(order.scheduled_at + datetime.timedelta(minutes=1), order.stop_id)
+        except BrokenProcessPool:
+            logger.error(f'Scraping process died while scraping stop {order.stop_id}, restarting the browsers')
+            next_order = ScrapOrder(order.scheduled_at + datetime.timedelta(minutes=1), order.stop_id)
+        except Exception as e:
+            # E.g. Chrome failed to launch, the stop is retried as when its page fails to load
+            logger.error(f'Failed to scrap stop {order.stop_id}: {e}')
+            next_order = ScrapOrder(order.scheduled_at + datetime.timedelta(minutes=1), order.stop_id)
+        put_order(orders, next_order)
+        wake.set()
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f'Added new order for {next_order.stop_id} planned at {_fmt(next_order.scheduled_at)}')
+
+
+async def main(stops_file: str, session: Session, logger: logging.Logger) -> None:
+    """
+    Scrap the stops listed in `stops_file` forever, with SCRAP_WORKERS stops being scraped concurrently.
+
+    Parameters
+    ----------
+    stops_file : str
+        JSON file with the list of stop ids to scrap.
+    session : Session
+        Session used to load the stops and their URLs once, before scraping.
+    logger : logging.Logger
+        Logger for progress and errors.
+    """
+    orders: asyncio.PriorityQueue = asyncio.PriorityQueue()
+    with open(stops_file, 'rb') as file:
+        stops_to_scrap: List[str] = orjson.loads(file.read())
         logger.info(f'Found {len(stops_to_scrap)} Stops to scrap')
 
+    # The stops and their URLs are loaded once, as plain rows, so scraping does not query the database
+    rows = session.execute(
+        select(Stop.stop_id, URLScrap.url, URLScrap.url_type)
+        .outerjoin(URLScrap, URLScrap.stop_id == Stop.stop_id)
+        .where(Stop.stop_id.in_(stops_to_scrap))
+    ).all()
+    urls_by_stop: Dict[str, List[Tuple[str, URLType]]] = dict()
+    for stop_id, url, url_type in rows:
+        stop_urls = urls_by_stop.setdefault(stop_id, list())
+        if url is not None:
+            stop_urls.append((url, url_type))
+    for stop_id in stops_to_scrap:
+        if stop_id not in urls_by_stop:
+            logger.warning(f'Stop {stop_id} not found in the database, it will not be scraped')
+
     base_time = datetime.datetime.now()
-    for i, stop_id in enumerate(stops_to_scrap):
-        scrap_order = ScrapOrder(scheduled_at=base_time + datetime.timedelta(seconds=10*1), stop_id=stop_id)
-        heapq.heappush(queue, scrap_order)
-    logger.info(f'Added {len(queue)} new scraping orders')
-
-    while queue:
-        if queue[0].scheduled_at > datetime.datetime.now():
-            logger.info(f'Sleeping for {(queue[0].scheduled_at - datetime.datetime.now()).total_seconds()} seconds')
-            time.sleep((queue[0].scheduled_at - datetime.datetime.now()).total_seconds())
-        order: ScrapOrder = heapq.heappop(queue)
-        logger.info(f'Processing order for {order.stop_id} planned at {order.scheduled_at.strftime("%Y-%m-%d %H:%M:%S")}')
-        next_order = scrap_stop(order, session, logger)
-        heapq.heappush(queue, next_order)
-        logger.info(f'Added new order for {next_order.stop_id} planned at {next_order.scheduled_at.strftime("%Y-%m-%d %H:%M:%S")}')
+    for i, stop_id in enumerate(urls_by_stop):
+        scrap_order = ScrapOrder(base_time + datetime.timedelta(seconds=10*1), stop_id)
+        put_order(orders, scrap_order)
+    logger.info(f'Added {orders.qsize()} new scraping orders')
+
+    wake = asyncio.Event()
+    throttle = asyncio.Lock()
+    processes = ScrapProcessPool(SCRAP_WORKERS)
+    # Single thread appending the scraped pages to the archive, off the event loop
+    writer = ThreadPoolExecutor(max_workers=1)
+    archive = ScrapeArchive(Path('.'))
+    try:
+        await asyncio.gather(
+            *(scrap_worker(orders, wake, throttle, processes, writer, archive, urls_by_stop, logger)
+              for _ in range(SCRAP_WORKERS))
+        )
+    finally:
+        processes.close()
+        writer.shutdown(wait=True)
+        archive.close()
 
 
 if __name__ == "__main__":  # pragma: no cover
@@ -166,7 +625,7 @@ if __name__ == "__main__":  # pragma: no cover
         sys.exit(1)
 
     # Call main with feed, session, and logger
-    main(args.stops_file, session_main, logger_main)
+    asyncio.run(main(args.stops_file, session_main, logger_main))
 
     # Close session
     # noinspection PyBroadException
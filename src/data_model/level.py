@@ -31,15 +31,11 @@ class Level(Base):
         """
         Initialize a Level instance.
 
-        Assigns provided keyword arguments to attributes if they match
-        model fields.
+        The keyword arguments are assigned by the SQLAlchemy declarative constructor.
 
         Parameters
         ----------
         **kwargs : LevelParams
             Field values corresponding to GTFS level attributes.
         """
-        super().__init__()
-        for key, value in kwargs.items():
-            if hasattr(self, key):
-                setattr(self, key, value)
\ No newline at end of file
+        super().__init__(**kwargs)
\ No newline at end of file
@@ -1,10 +1,9 @@
 -- url_scrap.sql
 
-CREATE TYPE url_type_enum AS ENUM ('ADIF_WEB', 'ADIF_JS_INFO');
 CREATE TABLE url_scrap (
 	url_id SERIAL NOT NULL,
 	url VARCHAR NOT NULL,
-	url_type url_type_enum NOT NULL,
+	url_type SMALLINT NOT NULL,
 	stop_id VARCHAR,
 	PRIMARY KEY (url_id),
 	UNIQUE (url),
@@ -13,6 +12,7 @@ CREATE TABLE url_scrap (
 WITH (
   OIDS = FALSE
 );
+CREATE INDEX ix_url_scrap_stop_type ON url_scrap (stop_id, url_type) INCLUDE (url);
 ALTER TABLE public.url_scrap
   OWNER TO prpe_user
 ;
@@ -225,15 +225,16 @@ class Stop(Base):
         """
         Initialize a Stop instance.
 
-        Assigns provided keyword arguments to attributes if they match
-        model fields.
+        The keyword arguments are assigned by the SQLAlchemy declarative constructor. The GTFS names
+        `parent_station_id` and `parent_station` are assigned to `parent_stop_id` and `parent_stop`.
 
         Parameters
         ----------
         **kwargs : StopParams
             Field values corresponding to GTFS stop attributes.
         """
-        super().__init__()
-        for key, value in kwargs.items():
-            if hasattr(self, key):
-                setattr(self, key, value)
+        if 'parent_station_id' in kwargs:
+            kwargs['parent_stop_id'] = kwargs.pop('parent_station_id')
+        if 'parent_station' in kwargs:
+            kwargs['parent_stop'] = kwargs.pop('parent_station')
+        super().__init__(**kwargs)
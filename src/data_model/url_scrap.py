@@ -6,6 +6,7 @@ Data model for externally scraped (or defined) URLs associated with railway stop
 
 This module defines:
 - URLType: Enumeration of supported external URL categories.
+- URLTypeDecorator: Column type storing a URLType as a SMALLINT.
 - URLParams: TypedDict describing initialization parameters for URLScrap.
 - URLScrap: SQLAlchemy ORM model representing a unique URL linked (optionally) to a Stop.
 
@@ -30,8 +31,10 @@ import enum
 from sqlalchemy import String
 from sqlalchemy import ForeignKey
 from sqlalchemy import UniqueConstraint
+from sqlalchemy import Index
 from sqlalchemy import Integer
-from sqlalchemy import Enum
+from sqlalchemy import SmallInteger
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.orm import mapped_column, relationship
 
 from src.data_model import Base
@@ -41,14 +44,15 @@ from sqlalchemy.orm import Mapped
 from typing import Union
 from typing import Dict
 from typing import Any
+from typing import Optional
 from typing import TypedDict
 from typing_extensions import Unpack
 from typing_extensions import NotRequired
 
 
-class URLType(enum.Enum):
+class URLType(enum.IntEnum):
     """
-    Enumeration of supported external URL types.
+    Enumeration of supported external URL types. Stored in the database as its integer value.
 
     Attributes
     ----------
@@ -61,6 +65,26 @@ class URLType(enum.Enum):
     ADIF_JS_INFO = 1
 
 
+class URLTypeDecorator(TypeDecorator):
+    """
+    Column type storing a URLType as its integer value in a SMALLINT, two bytes per row and integer comparisons in
+    filters and indexes.
+    """
+    impl = SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value: Optional[URLType], dialect) -> Optional[int]:
+        return None if value is None else int(value)
+
+    def process_result_value(self, value: Optional[int], dialect) -> Optional[URLType]:
+        return None if value is None else URLType(value)
+
+
+# Keys that identify a URL entry in the JSON seed files and name to member lookup of URLType, used by the object hook
+_REQUIRED_KEYS = frozenset(('url', 'url_type', 'stop'))
+_URL_TYPE_BY_NAME = URLType.__members__
+
+
 class URLScrapParams(TypedDict):
     """
     Typed dictionary of parameters accepted when constructing a URLScrap instance.
@@ -84,7 +108,8 @@ class URLScrap(Base):
     """
     ORM entity representing a unique external URL associated with a stop.
 
-    The combination of URL uniqueness is enforced through a table-level UniqueConstraint.
+    The combination of URL uniqueness is enforced through a table-level UniqueConstraint. The URLs of a stop are
+    looked up by (stop_id, url_type) through a covering index that also holds the URL.
 
     Attributes
     ----------
@@ -102,10 +127,12 @@ class URLScrap(Base):
     __tablename__ = "url_scrap"
     __table_args__ = (
         UniqueConstraint("url"),
+        Index('ix_url_scrap_stop_type', 'stop_id', 'url_type', postgresql_include=['url']),
     )
     url_id: Mapped[int] = mapped_column('url_id', Integer, primary_key=True, autoincrement=True)
-    url: Mapped[String] = mapped_column('url', String, nullable=False)
-    url_type: Mapped[URLType] = mapped_column('url_type', Enum(URLType, name='url_type_enum'), nullable=False)
+    # Only loaded when accessed, the scheduling and validation queries select the columns they need
+    url: Mapped[str] = mapped_column('url', String, nullable=False, deferred=True)
+    url_type: Mapped[URLType] = mapped_column('url_type', URLTypeDecorator(), nullable=False)
     stop_id: Mapped[str] = mapped_column('stop_id', ForeignKey('stop.stop_id'), nullable=True)
     stop: Mapped["Stop"] = relationship("Stop", back_populates="urls")
 
@@ -120,13 +147,12 @@ class URLScrap(Base):
             - A Stop instance (assigned to relationship)
             - A station ID string (assigned to `stop_id`)
         """
-        super().__init__()
-        for key, value in kwargs.items():
-            if hasattr(self, key):
-                if key == 'stop' and isinstance(value, str):
-                    self.stop_id = value
-                else:
-                    setattr(self, key, value)
+        stop = kwargs.pop('stop', None)
+        if isinstance(stop, str):
+            kwargs['stop_id'] = stop
+        elif stop is not None:
+            kwargs['stop'] = stop
+        super().__init__(**kwargs)
 
     @staticmethod
     def object_hook(dct: Dict[str, Any]) -> Union[URLScrap, None]:
@@ -162,10 +188,10 @@ class URLScrap(Base):
         The 'url_type' value in the input dictionary must match a member name
         of URLType (e.g., "ADIF_WEB", "ADIF_JS_INFO").
         """
-        if all(k in dct for k in ('url', 'url_type', 'stop')):
+        if _REQUIRED_KEYS <= dct.keys():
             return URLScrap(
                 url=dct['url'],
-                url_type=URLType[dct['url_type']],
+                url_type=_URL_TYPE_BY_NAME[dct['url_type']],
                 stop=dct['stop'],
             )
         return None
\ No newline at end of file
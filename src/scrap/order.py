@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import dataclasses
 import datetime
+import functools
 
+from typing import Tuple
 from typing import TypedDict
-from typing import Unpack
 
 
 class ScrapOrderParams(TypedDict):
@@ -11,22 +13,30 @@ class ScrapOrderParams(TypedDict):
     stop_id: str
 
 
+@functools.total_ordering
+@dataclasses.dataclass(frozen=True, slots=True, eq=False)
 class ScrapOrder:
-    __slots__ = ("scheduled_at", "stop_id")
+    scheduled_at: datetime.datetime
+    stop_id: str
+    # Sort key built once, the orders are compared many times in the scheduling heap
+    _key: Tuple[datetime.datetime, str] = dataclasses.field(init=False, repr=False)
 
-    def __init__(self, **kwargs: Unpack[ScrapOrderParams]):
-        self.scheduled_at = kwargs.get("scheduled_at")
-        self.stop_id = kwargs.get("stop_id")
+    def __post_init__(self):
+        object.__setattr__(self, "_key", (self.scheduled_at, self.stop_id))
 
+    @classmethod
+    def from_mapping(cls, params: ScrapOrderParams) -> "ScrapOrder":
+        return cls(params["scheduled_at"], params["stop_id"])
 
     def __eq__(self, other):
         if not isinstance(other, ScrapOrder):
             return NotImplemented
-        return (self.scheduled_at, self.stop_id) == (other.scheduled_at, other.stop_id)
+        return self._key == other._key
 
     def __lt__(self, other):
         if not isinstance(other, ScrapOrder):
             return NotImplemented
-        if self.scheduled_at != other.scheduled_at:
-            return self.scheduled_at < other.scheduled_at
-        return self.stop_id < other.stop_id
\ No newline at end of file
+        return self._key < other._key
+
+    def __hash__(self):
+        return hash(self._key)
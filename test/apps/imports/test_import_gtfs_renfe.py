@@ -0,0 +1,296 @@
+import errno
+import gzip
+import hashlib
+import io
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import blake3
+import pytest
+from urllib3 import HTTPResponse
+
+from src.apps.imports import import_gtfs_renfe
+from src.apps.imports.import_gtfs_renfe import (
+    sha256_file,
+    checksum_file,
+    compare_today_with_previous_day_checksum,
+    find_latest_file_in_dir,
+    deduplicate_today_with_symlink,
+    move_file,
+    stream_download,
+)
+
+
+# Shared by all the tests, built once
+LOGGER = logging.getLogger(__name__)
+
+
+@pytest.mark.parametrize("size", [0, 1000, 3 * 1024 + 7])
+def test_sha256_file_matches_hashlib(tmp_path, monkeypatch, size):
+    """Chunked and memory-mapped paths must produce the same digest."""
+    data = bytes(range(256)) * (size // 256) + b"x" * (size % 256)
+    path = tmp_path / "feed.zip"
+    path.write_bytes(data)
+    expected = hashlib.sha256(data).hexdigest()
+    assert sha256_file(str(path), chunk_size=1024) == expected
+    # Force the mmap path for any non-empty file
+    monkeypatch.setattr(import_gtfs_renfe, "MMAP_THRESHOLD", 1)
+    if size:
+        assert sha256_file(str(path)) == expected
+
+
+def test_checksum_file_is_blake3(tmp_path):
+    data = b"stop_id,stop_name\n71801,Barcelona-Sants\n" * 1000
+    path = tmp_path / "feed.zip"
+    path.write_bytes(data)
+    assert checksum_file(str(path)) == blake3.blake3(data).hexdigest()
+
+
+@pytest.mark.parametrize("has_copy_file_range", [True, False])
+def test_move_file_across_filesystems(tmp_path, monkeypatch, has_copy_file_range):
+    data = os.urandom(200_000)
+    src = tmp_path / "feed.zip.partial"
+    src.write_bytes(data)
+    dst = tmp_path / "feed.zip"
+
+    def _replace(a, b):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(os, "replace", _replace)
+    if not has_copy_file_range:
+        monkeypatch.delattr(os, "copy_file_range", raising=False)
+    move_file(str(src), str(dst))
+    assert dst.read_bytes() == data
+    assert not src.exists()
+
+
+def _expected_download_path(base_dir) -> str:
+    day = datetime.now().strftime("%Y-%m-%d")
+    return os.path.join(str(base_dir), day, day, f"{day}-{day}-renfe.zip")
+
+
+def test_stream_download_success(requests_mock, tmp_path):
+    url = "https://example.com/gtfs.zip"
+    body = os.urandom(100_000)
+    requests_mock.get(url, content=body, status_code=200, headers={"Content-Length": str(len(body))})
+    ok = stream_download(url=url, out_path=str(tmp_path), max_attempts=1, logger=LOGGER)
+    assert ok is True
+    assert requests_mock.last_request.headers["User-Agent"] in import_gtfs_renfe._UAS
+    final_path = _expected_download_path(tmp_path)
+    with open(final_path, "rb") as f:
+        assert f.read() == body
+    assert not os.path.exists(final_path + ".partial")
+    with open(final_path + ".sha256") as f:
+        assert f.read() == hashlib.sha256(body).hexdigest()
+
+
+def test_stream_download_decodes_content_encoding(requests_mock, tmp_path):
+    url = "https://example.com/gtfs.zip"
+    body = b"agency_id,agency_name\n1071,Renfe Operadora\n" * 5000
+    requests_mock.get(url, content=gzip.compress(body), status_code=200, headers={"Content-Encoding": "gzip"})
+    ok = stream_download(url=url, out_path=str(tmp_path), max_attempts=1, logger=LOGGER)
+    assert ok is True
+    with open(_expected_download_path(tmp_path), "rb") as f:
+        assert f.read() == body
+
+
+def test_stream_download_resumes_partial_file(requests_mock, tmp_path):
+    url = "https://example.com/gtfs.zip"
+    body = os.urandom(50_000)
+    final_path = _expected_download_path(tmp_path)
+    os.makedirs(os.path.dirname(final_path))
+    with open(final_path + ".partial", "wb") as f:
+        f.write(body[:20_000])
+    requests_mock.get(url, content=body[20_000:], status_code=206)
+    ok = stream_download(url=url, out_path=str(tmp_path), max_attempts=1, logger=LOGGER)
+    assert ok is True
+    assert requests_mock.last_request.headers["Range"] == "bytes=20000-"
+    with open(final_path, "rb") as f:
+        assert f.read() == body
+    # The digest covers the bytes downloaded by the previous run too
+    with open(final_path + ".sha256") as f:
+        assert f.read() == hashlib.sha256(body).hexdigest()
+
+
+def test_find_latest_file_in_dir(tmp_path):
+    for name in ("2025-11-28_gtfs.zip", "2025-11-30_gtfs.zip", "2025-12-01_other.zip", "latest_gtfs.zip"):
+        (tmp_path / name).write_bytes(b"x")
+    assert find_latest_file_in_dir(str(tmp_path), "gtfs.zip") == str(tmp_path / "2025-11-30_gtfs.zip")
+    assert find_latest_file_in_dir(str(tmp_path), "feed.zip") is None
+    assert find_latest_file_in_dir(str(tmp_path / "missing"), "gtfs.zip") is None
+
+
+def test_find_latest_file_in_dir_resolves_symlink(tmp_path):
+    target = tmp_path / "2025-11-29_gtfs.zip"
+    target.write_bytes(b"x")
+    os.symlink(target.name, tmp_path / "2025-11-30_gtfs.zip")
+    assert find_latest_file_in_dir(str(tmp_path), "gtfs.zip") == str(target)
+
+
+class _BrokenBody(io.BytesIO):
+    """Response body that fails after the first read, like a dropped connection."""
+
+    def read(self, size=-1):
+        if self.tell():
+            raise OSError("connection reset")
+        return super().read(size)
+
+
+def test_stream_download_resumes_after_broken_transfer(requests_mock, tmp_path):
+    url = "https://example.com/gtfs.zip"
+    body = os.urandom(3 * 1024 * 1024)
+    first_read = 1024 * 1024
+    requests_mock.get(url, [
+        {"raw": HTTPResponse(body=_BrokenBody(body), headers={"Content-Length": str(len(body))}, status=200,
+                             preload_content=False), "status_code": 200},
+        {"content": body[first_read:], "status_code": 206},
+    ])
+    ok = stream_download(url=url, out_path=str(tmp_path), max_attempts=2, logger=LOGGER)
+    assert ok is True
+    # The preallocated space is released on failure, so the retry resumes from the bytes really written
+    assert requests_mock.request_history[-1].headers["Range"] == f"bytes={first_read}-"
+    with open(_expected_download_path(tmp_path), "rb") as f:
+        assert f.read() == body
+
+
+def test_stream_download_restarts_when_range_not_satisfiable(requests_mock, tmp_path):
+    url = "https://example.com/gtfs.zip"
+    body = os.urandom(10_000)
+    final_path = _expected_download_path(tmp_path)
+    os.makedirs(os.path.dirname(final_path))
+    with open(final_path + ".partial", "wb") as f:
+        f.write(os.urandom(20_000))
+    requests_mock.get(url, [{"status_code": 416}, {"content": body, "status_code": 200}])
+    ok = stream_download(url=url, out_path=str(tmp_path), max_attempts=2, logger=LOGGER)
+    assert ok is True
+    assert "Range" not in requests_mock.last_request.headers
+    with open(final_path, "rb") as f:
+        assert f.read() == body
+
+
+class _UnavailableHandler(BaseHTTPRequestHandler):
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        self.send_response(503)
+        self.send_header("Retry-After", "0")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.mark.parametrize("max_attempts", [1, 3])
+def test_stream_download_bounds_requests_on_unavailable(tmp_path, max_attempts):
+    """A server always answering 503 gets max_attempts requests, the urllib3 and transfer retries do not multiply."""
+    _UnavailableHandler.requests = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _UnavailableHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/gtfs.zip"
+        ok = stream_download(url=url, out_path=str(tmp_path), max_attempts=max_attempts, logger=LOGGER)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert ok is False
+    assert _UnavailableHandler.requests == max_attempts
+
+
+def _write_dated(tmp_path, day: datetime, data: bytes) -> str:
+    day_str = day.strftime("%Y-%m-%d")
+    day_dir = tmp_path / day_str
+    day_dir.mkdir()
+    path = day_dir / f"{day_str}_gtfs.zip"
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.mark.parametrize("today_data, yesterday_data, expected", [
+    (b"a" * 10000, b"a" * 10000, True),
+    (b"a" * 10000, b"a" * 10001, False),
+    (b"b" + b"a" * 9999, b"a" * 10000, False),
+    (b"a" * 9999 + b"b", b"a" * 10000, False),
+])
+def test_compare_today_with_previous_day_checksum(tmp_path, today_data, yesterday_data, expected):
+    now = datetime.now()
+    today_file = _write_dated(tmp_path, now, today_data)
+    yesterday_file = _write_dated(tmp_path, now - timedelta(days=1), yesterday_data)
+    for fast_hash in (False, True):
+        same, today_fp, yest_fp = compare_today_with_previous_day_checksum(
+            os.path.join(str(tmp_path), "gtfs.zip"), fast_hash=fast_hash
+        )
+        assert same is expected
+        assert (today_fp, yest_fp) == (today_file, yesterday_file)
+
+
+def test_compare_skips_hashing_on_size_mismatch(tmp_path, monkeypatch):
+    now = datetime.now()
+    _write_dated(tmp_path, now, b"a" * 10)
+    _write_dated(tmp_path, now - timedelta(days=1), b"a" * 11)
+
+    def _fail(path):
+        raise AssertionError("hash should not be computed")
+
+    monkeypatch.setattr(import_gtfs_renfe, "sha256_file", _fail)
+    same, _, _ = compare_today_with_previous_day_checksum(os.path.join(str(tmp_path), "gtfs.zip"))
+    assert same is False
+
+
+@pytest.mark.parametrize("today_exists", [True, False])
+def test_deduplicate_today_with_symlink(tmp_path, today_exists):
+    yesterday_file = tmp_path / "2025-11-29_gtfs.zip"
+    yesterday_file.write_bytes(b"feed")
+    today_file = tmp_path / "2025-11-30_gtfs.zip"
+    if today_exists:
+        today_file.write_bytes(b"feed")
+    assert deduplicate_today_with_symlink(str(today_file), str(yesterday_file), LOGGER)
+    assert not os.path.islink(today_file)
+    assert os.path.samefile(today_file, yesterday_file)
+
+
+def test_deduplicate_today_falls_back_to_symlink(tmp_path, monkeypatch):
+    yesterday_file = tmp_path / "2025-11-29_gtfs.zip"
+    yesterday_file.write_bytes(b"feed")
+    today_file = tmp_path / "2025-11-30_gtfs.zip"
+    today_file.write_bytes(b"feed")
+
+    def _link(src, dst):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(os, "link", _link)
+    assert deduplicate_today_with_symlink(str(today_file), str(yesterday_file), LOGGER)
+    assert os.readlink(today_file) == str(yesterday_file)
+
+
+def test_compare_uses_checksum_sidecars(tmp_path, monkeypatch):
+    now = datetime.now()
+    today_file = _write_dated(tmp_path, now, b"a" * 10)
+    yesterday_file = _write_dated(tmp_path, now - timedelta(days=1), b"a" * 10)
+    for path in (today_file, yesterday_file):
+        with open(path + ".sha256", "w") as f:
+            f.write(hashlib.sha256(b"a" * 10).hexdigest())
+
+    def _fail(path):
+        raise AssertionError("hash should not be computed")
+
+    monkeypatch.setattr(import_gtfs_renfe, "sha256_file", _fail)
+    same, _, _ = compare_today_with_previous_day_checksum(os.path.join(str(tmp_path), "gtfs.zip"))
+    assert same is True
+
+
+def test_compare_ignores_stale_checksum_sidecar(tmp_path):
+    now = datetime.now()
+    today_file = _write_dated(tmp_path, now, b"a" * 10)
+    yesterday_file = _write_dated(tmp_path, now - timedelta(days=1), b"a" * 10)
+    with open(today_file + ".sha256", "w") as f:
+        f.write("0" * 64)
+    # The file was rewritten after its sidecar
+    os.utime(today_file + ".sha256", (0, 0))
+    same, _, _ = compare_today_with_previous_day_checksum(os.path.join(str(tmp_path), "gtfs.zip"))
+    assert same is True
@@ -1,22 +1,46 @@
 import re
-import json
 import logging
 import datetime
+import gzip
+import os
 from pathlib import Path
 
+import orjson
 import pytest
 import requests
 from requests.exceptions import ConnectionError
 
 # Import the module under test
 # Adjust import path if test layout differs; assuming src is on PYTHONPATH via pytest.ini or env
+from src.apps.imports import import_realtime_renfe
 from src.apps.imports.import_realtime_renfe import (
     build_headers,
-    save_json_to_file,
+    build_output_path,
+    save_response_to_file,
+    save_chunks_to_file,
     download_json,
+    retry_delay,
 )
 
 
+# Shared by all the tests, built once
+LOGGER = logging.getLogger(__name__)
+
+
+def find_renfe(directory: Path) -> list:
+    """Downloaded files, saved by download_json in a daily subdirectory of `directory`."""
+    return [
+        Path(entry.path)
+        for day in os.scandir(directory) if day.is_dir()
+        for entry in os.scandir(day.path) if entry.name.endswith("-renfe.json.gz")
+    ]
+
+
+def read_renfe(path: Path) -> bytes:
+    """Body of a downloaded file, stored gzip compressed."""
+    return gzip.decompress(path.read_bytes())
+
+
 class DummyUA:
     """Simple stand‑in for fake_useragent.UserAgent to avoid network dependency."""
     random = "DummyUserAgent/1.0"
@@ -30,91 +54,143 @@ def test_build_headers_contains_user_agent():
     assert len(headers) == 1
 
 
-def test_save_json_to_file_creates_timestamped_file(tmp_path):
-    data = {"k": "v"}
-    path = save_json_to_file(data, str(tmp_path))
-    assert Path(path).exists()
-    # Filename pattern: YYYY-MM-DD-HH-MM-SS-renfe.json
-    pattern = r"^\d{4}-\d{2}-\d{2}-\d{2}-\d{2}-\d{2}-renfe\.json$"
+def test_build_output_path_creates_daily_directory(tmp_path):
+    path = build_output_path(str(tmp_path))
+    assert Path(path).parent.is_dir()
+    assert Path(path).parent.parent == tmp_path
+    # Filename pattern: YYYY-MM-DD/YYYY-MM-DD-HH-MM-SS-renfe.json.gz
+    pattern = r"^\d{4}-\d{2}-\d{2}-\d{2}-\d{2}-\d{2}-renfe\.json\.gz$"
+    assert re.match(pattern, Path(path).name), f"Unexpected filename '{Path(path).name}'"
+    assert Path(path).name.startswith(Path(path).parent.name)
+
+
+def test_save_response_to_file_writes_raw_body(requests_mock, tmp_path):
+    url = "https://example.com/raw.json"
+    body = b'{"entity": [{"id": "1", "label": "R2N"}]}'
+    requests_mock.get(url, content=body, status_code=200, headers={"Content-Type": "application/json"})
+    resp = requests.get(url)
+    path = save_response_to_file(resp, str(tmp_path))
+    pattern = r"^\d{4}-\d{2}-\d{2}-\d{2}-\d{2}-\d{2}-renfe\.json\.gz$"
     assert re.match(pattern, Path(path).name), f"Unexpected filename '{Path(path).name}'"
-    saved = json.loads(Path(path).read_text(encoding="utf-8"))
-    assert saved == data
+    # Stored byte for byte, without re-serialization
+    assert read_renfe(Path(path)) == body
+
+
+def test_save_chunks_to_file_removes_partial_file(tmp_path):
+    def _chunks():
+        yield b'{"entity": ['
+        raise requests.exceptions.ChunkedEncodingError("connection broken")
+
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        save_chunks_to_file(_chunks(), str(tmp_path))
+    assert find_renfe(tmp_path) == []
 
 
 def test_download_json_success(requests_mock, tmp_path, caplog):
     url = "https://example.com/vehicle_positions.json"
     payload = {"vehicles": []}
     requests_mock.get(url, json=payload, status_code=200, headers={"Content-Type": "application/json"})
-    logger = logging.getLogger("test_success")
 
     caplog.set_level(logging.DEBUG)
-    ok = download_json(url=url, save_dir=str(tmp_path), max_attempts=1, verify_tls=True, logger=logger)
+    ok = download_json(url=url, save_dir=str(tmp_path), max_attempts=1, verify_tls=True, logger=LOGGER)
     assert ok is True
 
     # One call only (success on first attempt)
     assert requests_mock.call_count == 1
 
     # File exists
-    files = list(tmp_path.glob("*-renfe.json"))
+    files = find_renfe(tmp_path)
     assert len(files) == 1
-    assert json.loads(files[0].read_text(encoding="utf-8")) == payload
+    assert orjson.loads(read_renfe(files[0])) == payload
 
 
 def test_download_json_success_non_json_content_type(requests_mock, tmp_path):
     """Content-Type not indicating JSON but body is JSON; should still parse and save."""
     url = "https://example.com/data"
     payload = {"ok": True}
-    requests_mock.get(url, text=json.dumps(payload), status_code=200, headers={"Content-Type": "text/plain"})
-    logger = logging.getLogger("test_non_json_ct")
+    requests_mock.get(url, content=orjson.dumps(payload), status_code=200, headers={"Content-Type": "text/plain"})
+
+    ok = download_json(url=url, save_dir=str(tmp_path), max_attempts=1, verify_tls=True, logger=LOGGER)
+    assert ok is True
+    files = find_renfe(tmp_path)
+    assert len(files) == 1
+    assert orjson.loads(read_renfe(files[0])) == payload
 
-    ok = download_json(url=url, save_dir=str(tmp_path), max_attempts=1, verify_tls=True, logger=logger)
+
+def test_download_json_streams_large_body(requests_mock, tmp_path):
+    """The body spans several chunks, the first one is only peeked before everything is written."""
+    url = "https://example.com/vehicle_positions.json"
+    body = b"  " + orjson.dumps({"entity": [{"id": str(i), "label": "R2N"} for i in range(10000)]})
+    requests_mock.get(url, content=body, status_code=200, headers={"Content-Type": "application/json"})
+    ok = download_json(url=url, save_dir=str(tmp_path), max_attempts=1, verify_tls=True,
+                       logger=LOGGER)
     assert ok is True
-    files = list(tmp_path.glob("*-renfe.json"))
+    files = find_renfe(tmp_path)
     assert len(files) == 1
-    assert json.loads(files[0].read_text(encoding="utf-8")) == payload
+    assert read_renfe(files[0]) == body
 
 
 def test_download_json_access_denied_403(requests_mock, tmp_path):
     url = "https://example.com/forbidden"
     requests_mock.get(url, status_code=403)
-    logger = logging.getLogger("test_access_denied")
 
-    ok = download_json(url=url, save_dir=str(tmp_path), max_attempts=2, verify_tls=True, logger=logger)
+    ok = download_json(url=url, save_dir=str(tmp_path), max_attempts=2, verify_tls=True, logger=LOGGER)
     assert ok is False
     # Should stop on first 403 (no retries beyond)
     assert requests_mock.call_count == 1
-    assert list(tmp_path.glob("*-renfe.json")) == []
+    assert find_renfe(tmp_path) == []
 
 
-def test_download_json_retries_then_success(requests_mock, tmp_path):
-    url = "https://example.com/flaky"
-    payload = {"final": "ok"}
-    # First two attempts: 500, third: 200
-    requests_mock.get(url, [
-        {'status_code': 500},
-        {'status_code': 500},
-        {'json': payload, 'status_code': 200, 'headers': {'Content-Type': 'application/json'}}
-    ])
-    logger = logging.getLogger("test_retries")
-
-    ok = download_json(url=url, save_dir=str(tmp_path), max_attempts=3, verify_tls=True, logger=logger)
-    assert ok is True
-    assert requests_mock.call_count == 3
-    files = list(tmp_path.glob("*-renfe.json"))
-    assert len(files) == 1
-    assert json.loads(files[0].read_text(encoding="utf-8")) == payload
+class FakeResp:
+    """Minimal stand-in for requests.Response, enough for download_json."""
+    __slots__ = ("status_code", "content", "headers")
 
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or dict()
 
-def test_download_json_all_attempts_fail(requests_mock, tmp_path):
-    url = "https://example.com/alwaysfail"
-    # All attempts 500
-    requests_mock.get(url, status_code=500)
-    logger = logging.getLogger("test_all_fail")
+    def iter_content(self, chunk_size=1):
+        yield self.content
 
-    ok = download_json(url=url, save_dir=str(tmp_path), max_attempts=2, verify_tls=True, logger=logger)
-    assert ok is False
-    assert requests_mock.call_count == 2
-    assert list(tmp_path.glob("*-renfe.json")) == []
+    def close(self):
+        pass
+
+
+@pytest.mark.parametrize("statuses, max_attempts, expected", [
+    # Retried until success
+    ([500, 500, 200], 3, True),
+    # All the attempts fail
+    ([500, 500], 2, False),
+    # Transient server errors are retried until the attempts are exhausted
+    ([502, 502], 2, False),
+    ([503, 503], 2, False),
+])
+def test_download_json_retries(monkeypatch, tmp_path, statuses, max_attempts, expected):
+    payload = {"final": "ok"}
+    responses = [
+        FakeResp(status, orjson.dumps(payload), {"Content-Type": "application/json"})
+        if status == 200 else FakeResp(status)
+        for status in statuses
+    ]
+    calls = []
+
+    def _get(session, url, **kwargs):
+        calls.append(url)
+        return responses[len(calls) - 1]
+
+    monkeypatch.setattr(requests.Session, "get", _get)
+    monkeypatch.setattr(import_realtime_renfe, "retry_delay", lambda attempt, resp: 0.0)
+    ok = download_json(url="https://example.com/flaky", save_dir=str(tmp_path), max_attempts=max_attempts,
+                       verify_tls=True, logger=LOGGER)
+    assert ok is expected
+    assert len(calls) == len(statuses)
+    files = find_renfe(tmp_path)
+    if expected:
+        assert len(files) == 1
+        assert orjson.loads(read_renfe(files[0])) == payload
+    else:
+        assert files == []
 
 
 def todo_test_download_json_exception_then_success(requests_mock, tmp_path):
@@ -127,24 +203,22 @@ def todo_test_download_json_exception_then_success(requests_mock, tmp_path):
             raise ConnectionError("Simulated network issue")
         context.status_code = 200
         context.headers["Content-Type"] = "application/json"
-        return json.dumps(payload)
+        return orjson.dumps(payload).decode("utf-8")
 
     requests_mock.get(url, text=_request_callback)
-    logger = logging.getLogger("test_exception_then_success")
 
-    ok = download_json(url=url, save_dir=str(tmp_path), max_attempts=3, verify_tls=True, logger=logger)
+    ok = download_json(url=url, save_dir=str(tmp_path), max_attempts=3, verify_tls=True, logger=LOGGER)
     assert ok is True
     # At least 2 calls (one exception, one success)
     assert requests_mock.call_count >= 2
-    files = list(tmp_path.glob("*-renfe.json"))
+    files = find_renfe(tmp_path)
     assert len(files) == 1
-    assert json.loads(files[0].read_text(encoding="utf-8")) == payload
+    assert orjson.loads(read_renfe(files[0])) == payload
 
 
 def test_filename_timestamp_is_utc(tmp_path):
     """Indirectly verify timestamp uses UTC by comparing with current UTC time window."""
-    data = {"utc": True}
-    path = save_json_to_file(data, str(tmp_path))
+    path = build_output_path(str(tmp_path))
     fname = Path(path).name
     ts_part = fname.split("-renfe.json")[0]
     # Parse back
@@ -155,26 +229,25 @@ def test_filename_timestamp_is_utc(tmp_path):
     assert delta < 5, f"Timestamp {dt} not within 5s of current UTC {now_utc}"
 
 
-@pytest.mark.parametrize("status_code", [500, 502, 503])
-def test_download_json_transient_failures(status_code, requests_mock, tmp_path):
-    """Ensure transient server errors are retried until attempts exhausted."""
-    url = f"https://example.com/transient/{status_code}"
-    requests_mock.get(url, status_code=status_code)
-    logger = logging.getLogger(f"test_transient_{status_code}")
-
-    ok = download_json(url=url, save_dir=str(tmp_path), max_attempts=2, verify_tls=True, logger=logger)
-    assert ok is False
-    assert requests_mock.call_count == 2
-    assert list(tmp_path.glob("*-renfe.json")) == []
-
-
 def test_download_json_invalid_json_body(requests_mock, tmp_path):
     """Invalid JSON should cause ValueError and retries; final failure returns False."""
     url = "https://example.com/invalidjson"
     requests_mock.get(url, text="NOT_JSON", status_code=200, headers={"Content-Type": "application/json"})
-    logger = logging.getLogger("test_invalid_json")
 
-    ok = download_json(url=url, save_dir=str(tmp_path), max_attempts=2, verify_tls=True, logger=logger)
+    ok = download_json(url=url, save_dir=str(tmp_path), max_attempts=2, verify_tls=True, logger=LOGGER)
     assert ok is False
     assert requests_mock.call_count == 2
-    assert list(tmp_path.glob("*-renfe.json")) == []
\ No newline at end of file
+    assert find_renfe(tmp_path) == []
+
+
+def test_retry_delay_honors_retry_after(requests_mock):
+    url = "https://example.com/busy"
+    requests_mock.get(url, status_code=503, headers={"Retry-After": "7"})
+    resp = requests.get(url)
+    assert retry_delay(1, resp) == 7.0
+
+
+@pytest.mark.parametrize("attempt", [1, 2, 3, 10])
+def test_retry_delay_exponential_backoff_is_bounded(attempt):
+    delay = retry_delay(attempt, None)
+    assert 0.0 <= delay <= min(30.0, 2 ** attempt * 0.5)
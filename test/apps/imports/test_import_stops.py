@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+from src.apps.imports.import_stops import copy_stops
+from src.apps.imports.import_stops import parents_first
+from src.apps.imports.import_stops import stops_to_records
+from src.data_model.stop import LocationType, Stop, WheelchairBoarding
+
+
+def test_stops_to_records():
+    stops_df = pd.DataFrame({
+        "stop_id": ["71801", "  ", None, "79100"],
+        "stop_name": ["Barcelona-Sants", "x", "y", np.nan],
+        "stop_lat": [41.379, 1.0, 2.0, np.nan],
+        "location_type": ["1", None, "0", "9"],
+        "wheelchair_boarding": [np.nan, 1, 2, 0],
+        "parent_station": [None, None, None, "71801"],
+    })
+    records, skipped = stops_to_records(stops_df)
+    assert skipped == 2
+    assert records == [
+        {
+            "stop_id": "71801",
+            "stop_name": "Barcelona-Sants",
+            "stop_lat": 41.379,
+            "location_type": LocationType.STATION,
+        },
+        {
+            "stop_id": "79100",
+            "wheelchair_boarding": WheelchairBoarding.NO_INFORMATION,
+            "parent_stop_id": "71801",
+        },
+    ]
+
+
+def test_stops_to_records_without_stop_id_column():
+    records, skipped = stops_to_records(pd.DataFrame({"stop_name": ["Granollers Centre"]}))
+    assert records == []
+    assert skipped == 1
+
+
+def test_parents_first():
+    records = [
+        {"stop_id": "boarding", "parent_stop_id": "platform"},
+        {"stop_id": "platform", "parent_stop_id": "station"},
+        {"stop_id": "orphan", "parent_stop_id": "missing"},
+        {"stop_id": "station"},
+        {"stop_id": "other"},
+    ]
+    assert [record["stop_id"] for record in parents_first(records)] == [
+        "station", "other", "platform", "boarding", "orphan"
+    ]
+
+
+def test_copy_stops_keeps_parents(db_session):
+    stops_df = pd.DataFrame({
+        "stop_id": ["7180101", "71801"],
+        "stop_name": ["Barcelona-Sants (via 1)", "Barcelona-Sants"],
+        "location_type": ["0", "1"],
+        "parent_station": ["71801", None],
+    })
+    records, _ = stops_to_records(stops_df)
+    copy_stops(records, db_session)
+    stops = {stop.stop_id: stop for stop in db_session.scalars(select(Stop))}
+    assert stops["7180101"].parent_stop_id == "71801"
+    assert stops["71801"].children_stops == [stops["7180101"]]
+    assert stops["71801"].location_type == LocationType.STATION
@@ -0,0 +1,63 @@
+import logging
+
+import pytest
+from sqlalchemy import select
+
+from src.apps.imports.import_stops_urls import import_batch
+from src.data_model.stop import Stop
+from src.data_model.url_scrap import URLScrap
+from src.data_model.url_scrap import URLType
+
+
+# Shared by all the tests, built once
+LOGGER = logging.getLogger(__name__)
+
+SANTS_WEB = 'https://www.adif.es/w/71801-barcelona-sants'
+SANTS_JS_INFO = 'https://info.adif.es/?s=71801'
+GRANOLLERS_WEB = 'https://www.adif.es/w/79100-granollers-centre'
+
+
+def _url(url: str, url_type: str, stop: str) -> URLScrap:
+    return URLScrap.object_hook({'url': url, 'url_type': url_type, 'stop': stop})
+
+
+def _stored_urls(session) -> list:
+    return sorted(session.scalars(select(URLScrap.url)))
+
+
+@pytest.fixture
+def stops(bulk_insert):
+    bulk_insert(Stop, [{'stop_id': '71801'}, {'stop_id': '79100'}])
+
+
+def test_import_batch_inserts_new_urls(db_session, stops):
+    urls = [_url(SANTS_WEB, 'ADIF_WEB', '71801'), _url(GRANOLLERS_WEB, 'ADIF_WEB', '79100')]
+    assert import_batch(urls, False, db_session, LOGGER) == 2
+    assert _stored_urls(db_session) == [SANTS_WEB, GRANOLLERS_WEB]
+    stored = db_session.scalars(select(URLScrap).where(URLScrap.url == SANTS_WEB)).one()
+    assert (stored.stop_id, stored.url_type) == ('71801', URLType.ADIF_WEB)
+
+
+@pytest.mark.parametrize('skip, expected', [(True, 1), (False, None)])
+def test_import_batch_existing_url(db_session, stops, bulk_insert, skip, expected):
+    bulk_insert(URLScrap, [{'url': SANTS_WEB, 'url_type': URLType.ADIF_WEB, 'stop_id': '71801'}])
+    urls = [_url(SANTS_WEB, 'ADIF_WEB', '71801'), _url(SANTS_JS_INFO, 'ADIF_JS_INFO', '71801')]
+    assert import_batch(urls, skip, db_session, LOGGER) == expected
+    assert _stored_urls(db_session) == ([SANTS_JS_INFO, SANTS_WEB] if skip else [SANTS_WEB])
+
+
+@pytest.mark.parametrize('skip', [True, False])
+def test_import_batch_missing_stop(db_session, stops, caplog, skip):
+    urls = [_url(SANTS_WEB, 'ADIF_WEB', '71801'), _url('https://www.adif.es/w/99999-nowhere', 'ADIF_WEB', '99999')]
+    with caplog.at_level(logging.ERROR, logger=LOGGER.name):
+        assert import_batch(urls, skip, db_session, LOGGER) is None
+    assert 'Stop not found' in caplog.text
+    # Nothing of the invalid batch is inserted
+    assert _stored_urls(db_session) == []
+
+
+@pytest.mark.parametrize('skip, expected', [(True, 1), (False, None)])
+def test_import_batch_duplicate_in_batch(db_session, stops, skip, expected):
+    urls = [_url(SANTS_WEB, 'ADIF_WEB', '71801'), _url(SANTS_WEB, 'ADIF_WEB', '71801')]
+    assert import_batch(urls, skip, db_session, LOGGER) == expected
+    assert _stored_urls(db_session) == ([SANTS_WEB] if skip else [])
@@ -0,0 +1,194 @@
+import asyncio
+import datetime
+import gzip
+import logging
+import types
+from concurrent.futures.process import BrokenProcessPool
+
+import orjson
+import pytest
+
+from src.apps.scrap import scrap_stops
+from src.apps.scrap.scrap_stops import BrowserPool
+from src.apps.scrap.scrap_stops import ScrapeArchive
+from src.apps.scrap.scrap_stops import put_order
+from src.apps.scrap.scrap_stops import scrap_worker
+from src.data_model.url_scrap import URLType
+from src.scrap.order import ScrapOrder
+
+LOGGER = logging.getLogger(__name__)
+
+
+class FakeDriver:
+    """Stand-in for a Chrome driver, records whether it was quit."""
+
+    def __init__(self, number):
+        self.number = number
+        self.quit_called = False
+        self.switch_to = types.SimpleNamespace(default_content=lambda: None)
+
+    def delete_all_cookies(self):
+        pass
+
+    def quit(self):
+        self.quit_called = True
+
+
+def _driver_factory():
+    launched = []
+
+    def _factory():
+        launched.append(FakeDriver(len(launched)))
+        return launched[-1]
+    return _factory, launched
+
+
+def test_scrape_archive_round_trip(tmp_path, monkeypatch):
+    days = iter([datetime.date(2025, 11, 30), datetime.date(2025, 11, 30), datetime.date(2025, 12, 1)])
+    fake_date = types.SimpleNamespace(today=lambda: next(days))
+    monkeypatch.setattr(scrap_stops, "datetime", types.SimpleNamespace(date=fake_date))
+    archive = ScrapeArchive(tmp_path)
+    scheduled_at = datetime.datetime(2025, 11, 30, 23, 59, 50)
+    archive.write("79100", scheduled_at, URLType.ADIF_WEB, "<table id='tab-salidas'>é</table>")
+    archive.write("79100", scheduled_at, URLType.ADIF_JS_INFO, "<div class='train-row'></div>")
+    # The day changed, the next record goes to a new file
+    archive.write("71801", scheduled_at, URLType.ADIF_WEB, "<table></table>")
+    archive.close()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "scrapes_2025_11_30.ndjson.gz",
+        "scrapes_2025_12_01.ndjson.gz",
+    ]
+    with gzip.open(tmp_path / "scrapes_2025_11_30.ndjson.gz") as f:
+        records = [orjson.loads(line) for line in f]
+    assert records == [
+        {"stop_id": "79100", "ts": "2025-11-30T23:59:50", "type": "ADIF_WEB",
+         "html": "<table id='tab-salidas'>é</table>"},
+        {"stop_id": "79100", "ts": "2025-11-30T23:59:50", "type": "ADIF_JS_INFO",
+         "html": "<div class='train-row'></div>"},
+    ]
+    with gzip.open(tmp_path / "scrapes_2025_12_01.ndjson.gz") as f:
+        assert [orjson.loads(line)["stop_id"] for line in f] == ["71801"]
+
+
+def test_fmt_matches_strftime():
+    dt = datetime.datetime(2025, 1, 2, 3, 4, 5, 678)
+    assert scrap_stops._fmt(dt) == dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def test_browser_pool_recycles_drivers():
+    factory, launched = _driver_factory()
+    pool = BrowserPool(1, 2, factory)
+    assert launched == []
+    driver = pool.acquire()
+    pool.release(driver)
+    assert pool.acquire() is driver
+    # Second use, the driver is quit and the next checkout launches a new one
+    pool.release(driver)
+    assert driver.quit_called
+    assert pool.acquire() is launched[1]
+
+
+def test_browser_pool_discard_replaces_driver():
+    factory, launched = _driver_factory()
+    pool = BrowserPool(1, 100, factory)
+    driver = pool.acquire()
+    pool.discard(driver)
+    assert driver.quit_called
+    assert pool.acquire() is launched[1]
+
+
+def test_browser_pool_keeps_slot_when_launch_fails():
+    factory, launched = _driver_factory()
+    failures = [RuntimeError("chrome not reachable")]
+
+    def _flaky_factory():
+        if failures:
+            raise failures.pop()
+        return factory()
+
+    pool = BrowserPool(1, 100, _flaky_factory)
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+    # The slot was not lost, the next checkout launches a driver instead of blocking
+    assert pool.acquire() is launched[0]
+
+
+class FakeProcesses:
+    """Stand-in for ScrapProcessPool, records the scrapped orders and returns or raises `result`."""
+
+    def __init__(self, result=None):
+        self.orders = []
+        self.result = result
+
+    async def run(self, timeout, func, order, urls, logger):
+        self.orders.append(order)
+        if isinstance(self.result, BaseException):
+            raise self.result
+        return ScrapOrder(order.scheduled_at + datetime.timedelta(minutes=5), order.stop_id), []
+
+
+async def _run_worker(orders, processes, until, wake=None):
+    """Run a scrap_worker until `until()` is true, or fail after 2 seconds."""
+    wake = wake or asyncio.Event()
+    writer = types.SimpleNamespace(submit=lambda *args: None)
+    urls_by_stop = {"79100": [], "71801": []}
+    worker = asyncio.ensure_future(
+        scrap_worker(orders, wake, asyncio.Lock(), processes, writer, None, urls_by_stop, LOGGER)
+    )
+    try:
+        for _ in range(200):
+            if until():
+                return
+            await asyncio.sleep(0.01)
+        pytest.fail("the worker did not get there")
+    finally:
+        worker.cancel()
+
+
+def test_scrap_worker_wakes_up_for_earlier_order(monkeypatch):
+    monkeypatch.setattr(scrap_stops, "SCRAP_STAGGER", 0)
+    now = datetime.datetime.now()
+    late = ScrapOrder(now + datetime.timedelta(hours=1), "71801")
+    early = ScrapOrder(now, "79100")
+    processes = FakeProcesses()
+
+    async def _test():
+        orders = asyncio.PriorityQueue()
+        wake = asyncio.Event()
+        put_order(orders, late)
+
+        async def _queue_early():
+            # Let the worker start sleeping on the late order first
+            await asyncio.sleep(0.05)
+            put_order(orders, early)
+            wake.set()
+
+        asyncio.ensure_future(_queue_early())
+        await _run_worker(orders, processes, lambda: processes.orders, wake)
+
+    asyncio.run(_test())
+    assert processes.orders == [early]
+
+
+@pytest.mark.parametrize("error", [TimeoutError(), BrokenProcessPool(), RuntimeError("chrome not reachable")])
+def test_scrap_worker_reschedules_failed_scrap(monkeypatch, error):
+    monkeypatch.setattr(scrap_stops, "SCRAP_STAGGER", 0)
+    queued = []
+
+    def _put_order(orders, order):
+        queued.append(order)
+        put_order(orders, order)
+
+    monkeypatch.setattr(scrap_stops, "put_order", _put_order)
+    order = ScrapOrder(datetime.datetime.now(), "79100")
+    processes = FakeProcesses(error)
+
+    async def _test():
+        orders = asyncio.PriorityQueue()
+        put_order(orders, order)
+        await _run_worker(orders, processes, lambda: queued)
+
+    asyncio.run(_test())
+    assert processes.orders == [order]
+    assert queued == [ScrapOrder(order.scheduled_at + datetime.timedelta(minutes=1), "79100")]
@@ -1,41 +1,89 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import os
 import tempfile
 
 from pytest_postgresql import factories
+from pytest_postgresql.janitor import DatabaseJanitor
 from pathlib import Path
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.pool import NullPool
-from sqlalchemy import text
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
 from src.data_model import Base
+# Load the models so their tables are registered in Base.metadata
+from src.data_model.stop import Stop  # noqa: F401
+from src.data_model.level import Level  # noqa: F401
+from src.data_model.url_scrap import URLScrap  # noqa: F401
 import pytest
 
 
 test_folder: Path = Path(__file__).parent
-socket_dir: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory()
-postgresql_proc_prpe = factories.postgresql_proc(port=None, unixsocketdir=socket_dir.name, dbname='test_db')
-postgresql_prpe = factories.postgresql('postgresql_proc_prpe')
+# The Postgres socket lives in tmpfs when available. The test server does not need durability, so it neither syncs
+# its writes to disk nor waits for the WAL on commit. Each pytest-xdist worker starts its own server on a random port,
+# with its own socket directory
+worker_id: str = os.environ.get('PYTEST_XDIST_WORKER', 'gw0')
+socket_dir: tempfile.TemporaryDirectory = tempfile.TemporaryDirectory(
+    prefix=f'pg-{worker_id}-',
+    dir='/dev/shm' if os.path.isdir('/dev/shm') else None,
+)
+postgresql_proc_prpe = factories.postgresql_proc(
+    port=None,
+    unixsocketdir=socket_dir.name,
+    dbname='test_db',
+    postgres_options='-c fsync=off -c synchronous_commit=off -c full_page_writes=off',
+)
+
+
+@pytest.fixture(scope='session')
+def db_engine(postgresql_proc_prpe):
+    """Engine of the test database, created with the full schema once per test run."""
+    proc = postgresql_proc_prpe
+    with DatabaseJanitor(user=proc.user, host=proc.host, port=proc.port, dbname=proc.dbname,
+                         template_dbname=proc.template_dbname, password=proc.password):
+        connection = f'postgresql+psycopg://{proc.user}:@{proc.host}:{proc.port}/{proc.dbname}'
+        # The default QueuePool keeps the connections open between tests, a NullPool reconnected on every checkout
+        engine = create_engine(connection, echo=False, insertmanyvalues_page_size=1000)
+        # The schema is created by the same connection that runs the init SQL, so the tables belong to prpe_user
+        with engine.begin() as conn:
+            # One-shot multi-statement script, sent as is through the psycopg cursor without SQLAlchemy compiling it
+            with conn.connection.cursor() as cursor:
+                cursor.execute((test_folder / 'database_init.sql').read_text())
+            Base.metadata.create_all(conn)
+
+        yield engine
+
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+
 
 @pytest.fixture(scope='function')
-def db_session(postgresql_prpe):
-    """Session for SQLAlchemy."""
-    connection = f'postgresql+psycopg://{postgresql_prpe.info.user}:@{postgresql_prpe.info.host}:{postgresql_prpe.info.port}/{postgresql_prpe.info.dbname}'
-    engine = create_engine(connection, echo=False, poolclass=NullPool)
-    session = scoped_session(sessionmaker(bind=engine))
+def db_session(db_engine):
+    """
+    Session for SQLAlchemy. Each test runs inside a transaction that is rolled back at the end, the commits of the
+    test only release SAVEPOINTs, so the tests do not see each other's data.
+    """
+    connection = db_engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection, join_transaction_mode='create_savepoint')
 
-    sql_filename = str(test_folder) + '/database_init.sql'
-    with open(sql_filename, 'r') as sql_file:
-        sql = text(sql_file.read())
-        session.execute(sql)
+    yield session
 
-    Base.metadata.create_all(engine)
+    session.close()
+    transaction.rollback()
+    connection.close()
 
-    yield session
 
-    Base.metadata.drop_all(engine)
-    session.commit()
+@pytest.fixture(scope='function')
+def bulk_insert(db_session):
+    """
+    Insert seed rows, given as a list of dicts, into the table of a model with a single executemany INSERT instead of
+    adding ORM objects one by one.
+    """
+    def _bulk_insert(model, rows):
+        db_session.execute(insert(model), rows)
+        db_session.flush()
+    return _bulk_insert
 
 """
 Configuration of the database.
@@ -0,0 +1,28 @@
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateTable
+
+from src.data_model.stop import Stop
+from src.data_model.url_scrap import URLScrap
+from src.data_model.url_scrap import URLType
+from src.data_model.url_scrap import URLTypeDecorator
+
+
+def test_url_type_is_stored_as_smallint():
+    ddl = str(CreateTable(URLScrap.__table__).compile(dialect=postgresql.dialect()))
+    assert "url_type SMALLINT NOT NULL" in ddl
+    url_type = URLTypeDecorator()
+    dialect = postgresql.dialect()
+    assert url_type.process_bind_param(URLType.ADIF_JS_INFO, dialect) == 1
+    assert url_type.process_result_value(1, dialect) is URLType.ADIF_JS_INFO
+    assert url_type.process_result_value(None, dialect) is None
+
+
+def test_url_is_deferred(db_session, bulk_insert):
+    bulk_insert(Stop, [{'stop_id': '79100'}])
+    bulk_insert(URLScrap, [{'url': 'https://www.adif.es/w/79100-granollers-centre', 'url_type': URLType.ADIF_WEB,
+                            'stop_id': '79100'}])
+    url_scrap = db_session.scalars(select(URLScrap)).one()
+    assert 'url' not in url_scrap.__dict__
+    assert url_scrap.url_type is URLType.ADIF_WEB
+    assert url_scrap.url == 'https://www.adif.es/w/79100-granollers-centre'
@@ -0,0 +1,33 @@
+import dataclasses
+import datetime
+import pickle
+
+import pytest
+
+from src.scrap.order import ScrapOrder
+
+
+def test_scrap_order_from_mapping():
+    scheduled_at = datetime.datetime(2025, 11, 30, 10, 0, 0)
+    order = ScrapOrder.from_mapping({"scheduled_at": scheduled_at, "stop_id": "79100"})
+    assert order == ScrapOrder(scheduled_at, "79100")
+    assert (order.scheduled_at, order.stop_id) == (scheduled_at, "79100")
+
+
+def test_scrap_order_ordering():
+    scheduled_at = datetime.datetime(2025, 11, 30, 10, 0, 0)
+    early = ScrapOrder(scheduled_at, "79100")
+    same_time = ScrapOrder(scheduled_at, "71801")
+    late = ScrapOrder(scheduled_at + datetime.timedelta(minutes=5), "71801")
+    assert sorted([late, early, same_time]) == [same_time, early, late]
+    assert early != late
+    assert late > early >= same_time
+
+
+def test_scrap_order_is_frozen_and_picklable():
+    order = ScrapOrder(datetime.datetime(2025, 11, 30, 10, 0, 0), "79100")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        order.stop_id = "71801"
+    # The orders travel to the scraping processes
+    assert pickle.loads(pickle.dumps(order)) == order
+    assert hash(pickle.loads(pickle.dumps(order))) == hash(order)
@@ -1,3 +1,17 @@
+from sqlalchemy import func
+from sqlalchemy import select
+
+from src.data_model.stop import Stop
+
 
 def test_database(db_session):
-    pass
\ No newline at end of file
+    pass
+
+
+def test_db_session_commits_stay_in_the_test_transaction(db_session, db_engine, bulk_insert):
+    bulk_insert(Stop, [{'stop_id': '79100'}, {'stop_id': '71801', 'stop_name': 'Barcelona-Sants'}])
+    db_session.commit()
+    assert db_session.execute(select(func.count()).select_from(Stop)).scalar_one() == 2
+    # The commit only released a SAVEPOINT, other connections do not see the row
+    with db_engine.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(Stop)).scalar_one() == 0